@@ -1,35 +1,86 @@
+import time
+
+# Taken before the remaining imports so --startup-profile can report them
+_PROCESS_START = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox
-import time
-import random
-import json
+import argparse
+import math
 import os
+import signal
+import sys
 from datetime import timedelta
-from PIL import Image, ImageTk, ImageDraw
-import pystray
 import threading
 
+from cvshield_bridge import TkCommandQueue, TrayUpdater
+from cvshield_checkpoint import TimerCheckpoint, resume_plan
+from cvshield_controller import TimerController
+from cvshield_exercises import ExerciseCatalog
+from cvshield_history import BreakHistory, EVENT_BREAK, EVENT_SKIPPED, EVENT_PAUSE, EVENT_IDLE
+from cvshield_scenery import SceneryLibrary
+from cvshield_settings import SettingsStore
+from cvshield_scheduler import BreakScheduler, schedule_from_config, STOPPED, WORKING, PAUSED, ON_BREAK, EVENT_STATE, EVENT_TICK, EVENT_PREWARM
+# PIL, pystray and the imaging helpers are imported on first use so they stay
+# off the path to the first window.
+
+
+class StartupProfile:
+    """Timestamps of named startup phases, reported as a breakdown."""
+
+    def __init__(self, origin=_PROCESS_START):
+        self.origin = origin
+        self.marks = []
+
+    def mark(self, phase):
+        self.marks.append((phase, time.perf_counter()))
+
+    def report(self):
+        lines = ["CVShield startup profile:"]
+        previous = self.origin
+        for phase, stamp in self.marks:
+            lines.append(f"  {phase:<20} {(stamp - previous) * 1000:8.1f} ms"
+                         f"   (at {(stamp - self.origin) * 1000:8.1f} ms)")
+            previous = stamp
+        return "\n".join(lines)
+
 
 class CVShield:
+    # Legacy location (relative to the working directory), imported once
     SETTINGS_FILE = "cvshield_settings.json"
     # Default colors to ensure good contrast in light/dark modes
     DEFAULT_BG = "#f0f4f8"
     DEFAULT_BREAK_BG = "#ebf8ff"
     DEFAULT_TEXT = "#1a202c"
-    
+    # Rendered once per process and shared by every caller
+    _icon_image = None
+
     @staticmethod
-    def create_blank_icon():
+    def _logo_path():
+        """Return the path of `logo.png` if one ships with the script."""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        for logo_path in (os.path.join(base_dir, 'logo.png'),
+                          os.path.join(base_dir, 'images', 'logo.png')):
+            if os.path.exists(logo_path):
+                return logo_path
+        return None
+
+    @classmethod
+    def create_blank_icon(cls):
+        if cls._icon_image is not None:
+            return cls._icon_image
+        from PIL import Image, ImageDraw
+
         # Create a small blank icon
         icon_size = (32, 32)
-        # Try to load a `logo.png` located next to this script
+        # Try to load the logo shipped next to this script
         try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            logo_path = os.path.join(base_dir, 'logo.png')
-            if os.path.exists(logo_path):
+            logo_path = cls._logo_path()
+            if logo_path:
                 img = Image.open(logo_path).convert('RGBA')
                 # Resize while keeping aspect ratio, then paste on transparent background
-                img = img.resize(icon_size, Image.LANCZOS)
-                return img
+                cls._icon_image = img.resize(icon_size, Image.LANCZOS)
+                return cls._icon_image
         except Exception:
             # If any error, fall back to generated icon
             pass
@@ -38,28 +89,110 @@ class CVShield:
         icon_image = Image.new('RGBA', icon_size, color=(255, 255, 255, 0))
         draw = ImageDraw.Draw(icon_image)
         draw.rectangle([8, 8, 24, 24], fill='black')
+        cls._icon_image = icon_image
         return icon_image
 
-    def __init__(self):
+    def __init__(self, startup_profile=None, tracer=None, exit_after_startup=False):
+        self.startup_profile = startup_profile
+        # Quit (printing the profile, if any) once the window and tray are up
+        self.exit_after_startup = exit_after_startup
+        self._first_map_seen = False
+        self._tray_ready = False
+        # Optional cvshield_trace.Tracer; None means nothing is instrumented
+        self.tracer = tracer
+        self._mark("imports")
         # Initialize variables first
-        self.start_time = None
-        self.is_timer_running = False
         self.sent_notification = False
         self.break_interval = 0
         self.break_duration = 0
-        self.is_paused = False
-        self.pause_time = None
-        self.remaining_time = 0
         self.custom_pause_message = "Please take a short break!"  # Default pause message
         self.current_exercise = 0
         self.timer_id = None
         self.icon = None
+        # While the window is withdrawn only the tray is kept up to date
+        self._window_hidden = False
+        # Tray title/icon changes are applied on a tray-side thread
+        self.tray_updater = None
+        self._tray_title = None
         self.break_frame = None
+        self.pref_frame = None
         self.main_frame = None
+        self._break_screen_active = False
+        self._on_break_complete = None
+
+        # Tk-free timer core; the GUI and tray subscribe to its events
+        self.scheduler = BreakScheduler()
+        self.scheduler.subscribe(self._on_scheduler_event)
+        # What commands and idle reports do to the timer (shared with the simulator)
+        self.controller = TimerController(self.scheduler, self)
+        self.controller.subscribe(self._on_controller_event)
+        # Named break schedules from the settings (empty: break_interval/break_duration)
+        self.schedule_configs = []
+        self.coalesce_seconds = 60
+        # The schedule whose exercise the prefetcher picks (set on the Tk thread)
+        self._exercise_schedule = None
+        self.scheduler.subscribe(self._update_tray_title)
+        self.scheduler.subscribe(self._update_tray_icon)
+        # Breaks, skips and pauses go to an append-only log (written off-thread)
+        self.history = BreakHistory()
+        self.scheduler.subscribe(self._record_history)
+        # Scripts query and drive the timer over a local socket
+        self.control_server = None
+        self.scheduler.subscribe(self._publish_status)
+        # Changes made to the settings file while running are picked up live
+        self.settings_watcher = None
+        self._settings_watch_id = None
+        # Side effects on breaks and pauses, from the settings and installed plugins
+        self.hook_configs = []
+        self.hooks = None
+        # The current cycle survives restarts and crashes
+        self.checkpoint = TimerCheckpoint()
+        self.scheduler.subscribe(self._checkpoint_state)
+        # Pause automatically after this many idle seconds (0 disables)
+        self.idle_pause_seconds = 300
+        self.idle_monitor = None
+        self._idle_timer_id = None
+        # Progress-ring tray icons, rendered once when the tray is created
+        self._tray_frames = None
+        self._tray_frame_key = None
+        # Full-screen scenery frames, pre-scaled per resolution (created on first use)
+        self.image_cache_mb = 128
+        self._render_cache = None
+        # Cap on break imagery per break (0 = no cap), for low-RAM kiosks
+        self.break_memory_mb = 0
+        self.last_break_image_bytes = None
+        # Optional directory of photos rotated through on each break
+        self.scenery_dir = None
+        self.scenery_order = "shuffle"
+        self.scenery_library = None
+        self._next_scenery = None
+        # "scenery" (the photo) or "desktop" (a blurred, dimmed snapshot of the screen)
+        self.break_background = "scenery"
+        # How long the break may wait for the desktop snapshot before using the photo
+        self.desktop_capture_timeout = 0.25
+        # Optionally cover every monitor with its own break overlay
+        self.multi_monitor = False
+        self._next_monitors = None
+        self._break_screens = []
+        self._break_overlays = []
+        self._break_bg_images = {}
+        # Break assets are prepared this many seconds before the deadline
+        self.prewarm_seconds = 10
+        self._prefetcher = None
+        # Settings live in the XDG config dir; the old cwd file is imported once
+        self.settings_store = SettingsStore(legacy_paths=[
+            os.path.abspath(self.SETTINGS_FILE),
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), self.SETTINGS_FILE),
+        ])
         
         # Initialize Tkinter window
         self.root = tk.Tk()
         self.root.title("CVShield")
+        if self.tracer:
+            # Before any callback is bound, so every one of them is traced
+            self.tracer.install(self)
+        # The only way other threads (tray, control socket) reach Tk
+        self.commands = TkCommandQueue(self.root)
         
         # Configure window properties
         window_width = 600
@@ -76,54 +209,35 @@ class CVShield:
         
         # Ensure proper window closure
         self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self._mark("tk_root")
         
-        # Eye exercises list (one exercise for each break)
-        self.eye_exercises = [
-            "Blink 20 times.",
-            "Roll your eyes in a clockwise circle 10 times, then in a counterclockwise circle 10 times.",
-            "Hold your thumb in front of you at arm's length. Shift focus from your thumb to a distant object and back. Repeat 15 times.",
-            "Close your eyes tightly for 5 seconds, then open them wide. Repeat 10 times.",
-            "Draw the infinity symbol (a sideways figure-eight) with your eyes. Repeat the motion 10 times.",
-            "Focus on an object about 6 inches away, then switch to an object farther away. Repeat this focusing exercise 15 times.",
-            "Rapidly shift your gaze between two objects placed at least 10 feet apart. Repeat 20 times.",
-            "Sit up straight with your back against the chair.",
-            "Keep your feet flat on the floor.",
-            "Keep your knees at a 90-degree angle.",
-            "Keep your wrists straight when typing.",
-            "Stretch your back and neck."
-        ]
+        # Exercises come from indexed packs, read on the first break
+        self.exercise_locale = None
+        self.exercise_catalog = ExerciseCatalog()
         
         try:
             # Use the already-created root & container. Set close behavior to minimize to tray.
             self.root.protocol("WM_DELETE_WINDOW", self.minimize_to_tray)
 
-            # Initialize system tray icon with deferred menu creation
-            def create_menu():
-                return pystray.Menu(
-                    pystray.MenuItem("Show", lambda: self.root.after(0, self.show_window)),
-                    pystray.MenuItem("Start Timer", lambda: self.root.after(0, self.start_timer)),
-                    pystray.MenuItem("Edit Preferences", lambda: self.root.after(0, self.edit_preferences)),
-                    pystray.MenuItem("Reset Preferences", lambda: self.root.after(0, self.reset_preferences)),
-                    pystray.MenuItem("Quit", lambda: self.root.after(0, self.quit_application))
-                )
-
-            self.icon = pystray.Icon(
-                "CVShield",
-                self.create_blank_icon()
-            )
-            self.icon.menu = create_menu()
+            # Create main window elements (single call). The break and
+            # preferences frames are built the first time they are shown.
+            self.setup_gui()
+            self._mark("main_window")
 
-            # Ensure settings exist at startup
+            # Ensure settings exist at startup (may show the preferences frame)
             self.ensure_settings_exist()
+            self._mark("settings")
 
-            # Create main window elements (single call)
-            self.setup_gui()
-
-            # Set Tk window icon to logo.png if available (use same image as tray)
+            # Set Tk window icon to logo.png if available. Tk reads PNG
+            # natively, so PIL is not needed for this.
             try:
-                pil_icon = self.create_blank_icon()
-                # Keep a reference to avoid GC
-                self._tk_icon_image = ImageTk.PhotoImage(pil_icon)
+                logo_path = self._logo_path()
+                if logo_path:
+                    self._tk_icon_image = tk.PhotoImage(file=logo_path)
+                else:
+                    # Fallback icon (simple square), as for the tray
+                    self._tk_icon_image = tk.PhotoImage(width=32, height=32)
+                    self._tk_icon_image.put('black', to=(8, 8, 25, 25))
                 try:
                     self.root.iconphoto(False, self._tk_icon_image)
                 except Exception:
@@ -133,10 +247,22 @@ class CVShield:
                 pass
 
             # Show the window immediately after setup
+            if self.startup_profile or self.exit_after_startup:
+                self.root.bind('<Map>', self._on_first_map, add='+')
+            # Also catches the window manager minimizing or restoring the window
+            self.root.bind('<Map>', lambda e: e.widget is self.root and self._set_window_hidden(False), add='+')
+            self.root.bind('<Unmap>', lambda e: e.widget is self.root and self._set_window_hidden(True), add='+')
             self.root.deiconify()
             self.root.lift()
             self.root.focus_force()
 
+            # The tray (pystray + PIL) is set up once the window is on screen
+            self.root.after_idle(self.setup_system_tray)
+            self.root.after_idle(self._start_control_server)
+            self.root.after_idle(self._restore_checkpoint)
+            self.root.after_idle(self._start_hooks)
+            self.root.after_idle(self._start_settings_watch)
+
         except Exception as e:
             messagebox.showerror("Error", f"Failed to initialize application: {str(e)}")
             if self.root:
@@ -151,14 +277,67 @@ class CVShield:
                     pass
             raise
 
+    def _mark(self, phase):
+        if self.startup_profile:
+            self.startup_profile.mark(phase)
+
+    def _on_first_map(self, event):
+        """Record when the main window first appears on screen."""
+        if event.widget is not self.root or self._first_map_seen:
+            return
+        self._first_map_seen = True
+        self._mark("first_window")
+        self._maybe_exit_after_startup()
+
+    def _maybe_exit_after_startup(self):
+        """Print the startup report and exit once window and tray are ready, if asked to."""
+        if not (self.exit_after_startup and self._first_map_seen and self._tray_ready):
+            return
+        if self.startup_profile:
+            print(self.startup_profile.report())
+        self.root.after(0, self.quit_application)
+
+    @property
+    def render_cache(self):
+        if self._render_cache is None:
+            from cvshield_imaging import RenderCache
+            self._render_cache = RenderCache(memory_budget=self._image_cache_bytes())
+        return self._render_cache
+
+    def _image_cache_bytes(self):
+        # Under a break memory cap, frames are only kept as mappings of the disk cache
+        return 0 if self.break_memory_mb else self.image_cache_mb * 1024 * 1024
+
+    @property
+    def prefetcher(self):
+        if self._prefetcher is None:
+            from cvshield_prefetch import BreakPrefetcher
+            self._prefetcher = BreakPrefetcher(
+                self.render_cache,
+                self._choose_exercise)
+            if self.tracer:
+                self.tracer.wrap_methods(self._prefetcher, ("_prepare",))
+        return self._prefetcher
+
+    def _choose_exercise(self):
+        """Runs on the prefetch thread, so it only reads what the Tk thread set."""
+        schedule = self._exercise_schedule
+        if schedule is None:
+            return self.exercise_catalog.choose(self.scheduler.break_duration or self.break_duration)
+        return self.exercise_catalog.choose(schedule.duration, schedule.category)
+
     def on_close(self):
         """Handle window closing."""
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
-            if self.icon:
-                try:
-                    self.icon.stop()
-                except:
-                    pass
+            self.settings_store.flush()
+            self._write_exit_checkpoint()
+            self.history.close()
+            if self.control_server is not None:
+                self.control_server.close()
+            if self.hooks is not None:
+                self.hooks.close()
+            self._stop_settings_watch()
+            self._stop_tray()
             self.root.quit()
         
     def setup_gui(self):
@@ -233,20 +412,74 @@ class CVShield:
                                        style="Settings.TLabel")
         self.message_label.pack(anchor='w', padx=8, pady=3)
 
-        # Create additional frames
-        self.setup_break_frame()
-        self.setup_preferences_frame()
-
         # Update display
         self.update_preferences_display()
 
     def setup_system_tray(self):
         """Set up the system tray icon and menu."""
-        pass  # This is now handled in __init__
+        import pystray
+
+        # Initialize system tray icon with deferred menu creation
+        def create_menu():
+            items = [
+                pystray.MenuItem("Show", lambda: self.commands.post(self.show_window)),
+                pystray.MenuItem("Start Timer", lambda: self.commands.post(self.start_timer)),
+                pystray.MenuItem("Edit Preferences", lambda: self.commands.post(self.edit_preferences)),
+                pystray.MenuItem("Reset Preferences", lambda: self.commands.post(self.reset_preferences)),
+            ]
+            if self.tracer:
+                items.append(pystray.MenuItem("Save Trace", lambda: self.commands.post(self.save_trace)))
+            items.append(pystray.MenuItem("Quit", lambda: self.commands.post(self.quit_application)))
+            return pystray.Menu(*items)
+
+        try:
+            self.icon = pystray.Icon(
+                "CVShield",
+                self.create_blank_icon()
+            )
+            self.icon.menu = create_menu()
+            from cvshield_tray import TrayProgressFrames
+            self._tray_frames = TrayProgressFrames(self.create_blank_icon())
+            self.tray_updater = TrayUpdater(self.icon)
+            self._update_tray_title(self.scheduler, EVENT_STATE)
+            self._update_tray_icon(self.scheduler, EVENT_STATE)
+            # pystray runs its own event loop; keep it off the Tk thread
+            threading.Thread(target=self.icon.run, name="cvshield-tray", daemon=True).start()
+        except Exception:
+            # The window remains fully usable without a tray icon
+            self.icon = None
+            if self.tray_updater is not None:
+                self.tray_updater.close()
+                self.tray_updater = None
+        self._mark("tray")
+        self._tray_ready = True
+        self._maybe_exit_after_startup()
+
+    def _stop_tray(self):
+        if self.tray_updater is not None:
+            self.tray_updater.close()
+        if self.icon:
+            try:
+                self.icon.stop()
+            except Exception:
+                pass
+
+    def save_trace(self):
+        """Write the trace buffer to a Chrome trace file."""
+        if not self.tracer:
+            return None
+        try:
+            path = self.tracer.dump()
+        except OSError as e:
+            print(f"CVShield: could not save trace: {e}", file=sys.stderr)
+            return None
+        print(f"CVShield: trace saved to {path}", file=sys.stderr)
+        return path
 
     def show_window(self):
         """Show the main window."""
         if self.root:
+            self._set_window_hidden(False)
             self.root.after(0, self.root.deiconify)
             self.root.after(100, self.root.lift)
             self.root.after(200, self.root.focus_force)
@@ -255,12 +488,39 @@ class CVShield:
         """Minimize the window to system tray."""
         if self.root:
             self.root.withdraw()
+            self._set_window_hidden(True)
+
+    def _set_window_hidden(self, hidden):
+        """Switch between per-second window updates and minute-level tray updates."""
+        if hidden == self._window_hidden:
+            return
+        self._window_hidden = hidden
+        self._apply_power_mode()
+        if not hidden:
+            # Bring the label and tray up to the second right away
+            self._on_scheduler_event(self.scheduler, EVENT_TICK)
+            self._update_tray_title(self.scheduler, EVENT_TICK)
+        self._schedule_tick()
+
+    def _apply_power_mode(self):
+        # The break screen always counts seconds, even with the main window hidden
+        low_power = self._window_hidden and self.scheduler.state != ON_BREAK
+        self.scheduler.granularity = 60.0 if low_power else 1.0
 
     def quit_application(self):
         """Quit the application."""
         try:
-            if self.icon:
-                self.icon.stop()
+            if self._prefetcher is not None:
+                self._prefetcher.shutdown()
+            self.settings_store.flush()
+            self._write_exit_checkpoint()
+            self.history.close()
+            if self.control_server is not None:
+                self.control_server.close()
+            if self.hooks is not None:
+                self.hooks.close()
+            self._stop_settings_watch()
+            self._stop_tray()
             if self.root:
                 self.root.quit()
         except Exception:
@@ -274,7 +534,17 @@ class CVShield:
 
         # Save settings in case they were just configured
         self.save_settings()
+        self._show_running_controls()
 
+        self.scheduler.configure(self.break_interval, self.break_duration)
+        self.scheduler.prewarm_lead = self.prewarm_seconds
+        self.sent_notification = False
+        # Starting the scheduler renders the initial time immediately
+        self.scheduler.start()
+        self._schedule_tick()
+        self._start_idle_monitor()
+
+    def _show_running_controls(self):
         # Update buttons (hide main buttons)
         self.start_button.pack_forget()
         self.edit_pref_button.pack_forget()
@@ -285,23 +555,50 @@ class CVShield:
         self.stop_button.pack(pady=5, padx=5, fill='x')
         self.edit_break_button.pack(pady=5, padx=5, fill='x')
 
-        self.start_time = time.time()
-        self.is_timer_running = True
-        self.sent_notification = False
-        # Show initial time immediately
-        self.track_time()  # This will schedule the next update
-        if self.icon:
-            self.icon.title = "CVShield - Timer Running"
+    def _restore_checkpoint(self):
+        """Resume the cycle that was running when CVShield last exited."""
+        if self.scheduler.state != STOPPED or not self.break_interval or not self.break_duration:
+            return
+        plan = resume_plan(self.checkpoint.read(), time.time(), self.break_interval, self.break_duration)
+        if plan is None:
+            return
+        state, elapsed, break_length = plan
+        self._show_running_controls()
+        self.scheduler.configure(self.break_interval, self.break_duration)
+        self.scheduler.prewarm_lead = self.prewarm_seconds
+        # The state listener puts up the break screen if a break is resumed
+        self.scheduler.restore(state, elapsed, break_length)
+        self._sync_pause_button()
+        self._schedule_tick()
+        self._start_idle_monitor()
+
+    def _checkpoint_state(self, scheduler, event):
+        """Save the cycle on every state change (never on ticks)."""
+        if event != EVENT_STATE:
+            return
+        try:
+            self.checkpoint.write(scheduler.state, scheduler.phase_elapsed(), scheduler.break_length,
+                                  idle_paused=self._in_idle_pause())
+        except OSError:
+            pass
+
+    def _write_exit_checkpoint(self):
+        """Mark the checkpoint as a clean exit so offline time can be credited."""
+        try:
+            self.checkpoint.write(self.scheduler.state, self.scheduler.phase_elapsed(),
+                                  self.scheduler.break_length, clean_exit=True,
+                                  idle_paused=self._in_idle_pause())
+        except OSError:
+            pass
+
+    def _in_idle_pause(self):
+        return self.scheduler.state == PAUSED and self.controller.idle_paused
 
     def stop_timer(self, _=None):
         """Stop the timer and reset the GUI."""
-        self.is_timer_running = False
-        if self.timer_id:
-            self.root.after_cancel(self.timer_id)
-            self.timer_id = None
-        self.timer_label.config(text="😎 CVShield - Inactive")
-        if self.icon:
-            self.icon.title = "CVShield - Inactive"
+        self.scheduler.stop()
+        self._cancel_tick()
+        self._stop_idle_monitor()
 
         # Hide pause, stop, and edit break buttons
         self.pause_button.pack_forget()
@@ -317,160 +614,285 @@ class CVShield:
 
     def toggle_pause_timer(self, _=None):
         """Pause or resume the timer."""
-        if self.is_paused:
-            paused_duration = time.time() - self.pause_time
-            self.start_time += paused_duration
-            self.is_paused = False
-            self.timer_label.config(text="😎 CVShield - Timer Running")
-            self.pause_button.config(text="Pause Timer")
-            if self.icon:
-                self.icon.title = "CVShield - Timer Running"
-            self.timer_id = self.root.after(1000, self.track_time)
+        self.controller.toggle_pause()
+
+    def timer_changed(self):
+        """Called by the controller after it changed the scheduler's state."""
+        self._sync_pause_button()
+        # Paused schedulers report no wakeup, so this cancels the pending tick
+        self._schedule_tick()
+
+    def _on_controller_event(self, controller, action, details):
+        if action == "idle_break":
+            self.history.record(EVENT_IDLE, self.break_duration, details["away_seconds"])
         else:
-            self.is_paused = True
-            self.pause_time = time.time()
-            if self.timer_id:
-                self.root.after_cancel(self.timer_id)
-                self.timer_id = None
-            self.remaining_time = self.break_interval - (self.pause_time - self.start_time)
-            minutes = int(self.remaining_time // 60)
-            seconds = int(self.remaining_time % 60)
-            pause_text = f"⏸️ {minutes}m {seconds}s remaining"
-            self.timer_label.config(text=pause_text)
-            self.pause_button.config(text="Resume Timer")
-            if self.icon:
-                self.icon.title = f"CVShield - Paused: {minutes}m {seconds}s"
+            self._fire_hooks(action, **details)
 
-    def track_time(self):
-        """Track elapsed time and handle notifications or break initiation."""
-        if not self.is_timer_running or self.is_paused:
+    def _sync_pause_button(self):
+        self.pause_button.config(text="Resume Timer" if self.scheduler.is_paused else "Pause Timer")
+
+    def _start_idle_monitor(self):
+        """Begin watching for user inactivity, if enabled and supported."""
+        if self.idle_pause_seconds <= 0:
             return
+        if self.idle_monitor is None:
+            from cvshield_idle import IdleMonitor, default_activity_source
+            source = default_activity_source()
+            if source is None:
+                return
+            self.idle_monitor = IdleMonitor(source, self.idle_pause_seconds,
+                                            on_idle=self.controller.user_idle,
+                                            on_active=self.controller.user_active,
+                                            clock=self.scheduler.clock)
+        self.idle_monitor.threshold = self.idle_pause_seconds
+        if self._idle_timer_id is None:
+            self._poll_idle()
+
+    def _stop_idle_monitor(self):
+        if self._idle_timer_id is not None:
+            try:
+                self.root.after_cancel(self._idle_timer_id)
+            except Exception:
+                pass
+            self._idle_timer_id = None
+        self.controller.idle_paused = False
 
-        # Calculate elapsed and remaining time
-        elapsed_time = time.time() - self.start_time
-        remaining_time = self.break_interval - elapsed_time
+    def _poll_idle(self):
+        delay = self.idle_monitor.poll()
+        self._idle_timer_id = self.root.after(max(1, int(delay * 1000)), self._poll_idle)
+
+    @property
+    def is_timer_running(self):
+        return self.scheduler.is_running
+
+    @property
+    def is_paused(self):
+        return self.scheduler.is_paused
+
+    def _cancel_tick(self):
+        if self.timer_id:
+            try:
+                self.root.after_cancel(self.timer_id)
+            except Exception:
+                pass
+            self.timer_id = None
 
-        # If the timer hits zero, start the break
-        if remaining_time <= 0:
-            self.start_break()
+    def _schedule_tick(self):
+        """Arm a single after() for the scheduler's next deadline or display change."""
+        self._cancel_tick()
+        delay = self.scheduler.next_wakeup()
+        if delay is None:
             return
+        self.timer_id = self.root.after(max(1, int(math.ceil(delay * 1000))), self.track_time)
+
+    def track_time(self):
+        """Advance the scheduler; subscribers render and handle break transitions."""
+        self.timer_id = None
+        self.scheduler.poll()
+        self._schedule_tick()
 
-        # Calculate remaining minutes and seconds
+    @staticmethod
+    def format_time_until_break(remaining_time):
+        """Return the pluralized "Time until break" text for a countdown."""
         minutes, seconds = divmod(int(remaining_time), 60)
 
         # Handle singular/plural for seconds and format the time
         if minutes > 0:
             if minutes == 1:
                 if seconds == 1:
-                    timer_text = "Time until break: 1 minute 1 second"
-                else:
-                    timer_text = f"Time until break: 1 minute {seconds} seconds"
-            else:
-                if seconds == 1:
-                    timer_text = f"Time until break: {minutes} minutes 1 second"
-                else:
-                    timer_text = f"Time until break: {minutes} minutes {seconds} seconds"
-        else:
+                    return "Time until break: 1 minute 1 second"
+                return f"Time until break: 1 minute {seconds} seconds"
             if seconds == 1:
-                timer_text = "Time until break: 1 second"
+                return f"Time until break: {minutes} minutes 1 second"
+            return f"Time until break: {minutes} minutes {seconds} seconds"
+        if seconds == 1:
+            return "Time until break: 1 second"
+        return f"Time until break: {seconds} seconds"
+
+    def _on_scheduler_event(self, scheduler, event):
+        """Render the main window for the scheduler's current state."""
+        state = scheduler.state
+        if event == EVENT_PREWARM:
+            self._prefetch_break()
+            return
+        if event == EVENT_STATE:
+            self._apply_power_mode()
+            if state == ON_BREAK and not self._break_screen_active:
+                self.start_break()
+                return
+            if self._break_screen_active and state != ON_BREAK:
+                self._finish_break_screen()
+                return
+
+        if self._window_hidden and state != ON_BREAK:
+            # Nobody can see the label; showing the window re-renders it
+            return
+        if state == WORKING:
+            remaining_time = scheduler.remaining()
+            self.timer_label.config(text=f"😎 {self.format_time_until_break(remaining_time)}")
+        elif state == PAUSED:
+            minutes, seconds = divmod(int(scheduler.remaining()), 60)
+            self.timer_label.config(text=f"⏸️ {minutes}m {seconds}s remaining")
+        elif state == ON_BREAK:
+            self.update_break_timer()
+        else:
+            self.timer_label.config(text="😎 CVShield - Inactive")
+
+    def _update_tray_title(self, scheduler, event):
+        """Mirror the scheduler state into the tray icon tooltip."""
+        if self.tray_updater is None:
+            return
+        state = scheduler.state
+        if state == WORKING and self._window_hidden:
+            # Matches the minute-level wakeups used while the window is hidden
+            title = f"CVShield - {math.ceil(scheduler.remaining() / 60)} min until break"
+        elif state == WORKING:
+            title = f"CVShield - {self.format_time_until_break(scheduler.remaining())}"
+        elif state == PAUSED:
+            minutes, seconds = divmod(int(scheduler.remaining()), 60)
+            title = f"CVShield - Paused: {minutes}m {seconds}s"
+        elif state == ON_BREAK:
+            title = "CVShield - Break!"
+        else:
+            title = "CVShield - Inactive"
+        if title != self._tray_title:
+            self._tray_title = title
+            self.tray_updater.update(title=title)
+
+    def _update_tray_icon(self, scheduler, event):
+        """Swap the tray image only when the visible progress frame changes."""
+        if self.tray_updater is None or self._tray_frames is None:
+            return
+        state = scheduler.state
+        if state in (WORKING, PAUSED) and scheduler.current_interval() > 0:
+            elapsed = 1.0 - scheduler.remaining() / scheduler.current_interval()
+            key = ('work', self._tray_frames.index_for(elapsed))
+        elif state == ON_BREAK:
+            key = ('break',)
+        else:
+            key = ('idle',)
+        if key == self._tray_frame_key:
+            return
+        self._tray_frame_key = key
+        try:
+            if key[0] == 'work':
+                image = self._tray_frames.frame(key[1])
+            elif key[0] == 'break':
+                image = self._tray_frames.break_frame()
             else:
-                timer_text = f"Time until break: {seconds} seconds"
+                image = self.create_blank_icon()
+        except Exception:
+            return
+        self.tray_updater.update(icon=image)
 
-        # Update timer label and system tray icon
-        self.timer_label.config(text=f"😎 {timer_text}")
-        if self.icon:
-            self.icon.title = f"CVShield - {timer_text}"
+    def _record_history(self, scheduler, event):
+        """Log completed breaks, skipped breaks and pauses."""
+        if event != EVENT_STATE:
+            return
+        previous = scheduler.previous_state
+        if previous == ON_BREAK:
+            kind = EVENT_BREAK if scheduler.state == WORKING else EVENT_SKIPPED
+            self.history.record(kind, scheduler.break_length, scheduler.previous_state_duration)
+        elif previous == PAUSED and not self.controller.idle_paused:
+            # Idle pauses credited as breaks are logged as EVENT_IDLE instead
+            self.history.record(EVENT_PAUSE, 0, scheduler.previous_state_duration)
+
+    def _publish_status(self, scheduler, event):
+        """Hand the control socket a fresh snapshot to answer status from."""
+        if self.control_server is None:
+            return
+        state = scheduler.state
+        remaining = scheduler.remaining() if state in (WORKING, PAUSED, ON_BREAK) else None
+        self.control_server.publish({
+            "state": state,
+            "remaining": remaining,
+            "break_interval": self.break_interval,
+            "break_duration": self.break_duration,
+            "break_image_bytes": self.last_break_image_bytes,
+            "at": scheduler.clock(),
+        })
 
-        # Schedule next update
-        self.timer_id = self.root.after(1000, self.track_time)
+    def _extra_status(self):
+        """Live figures the control socket adds to every status reply."""
+        return {"command_latency": self.commands.latency_stats(),
+                "hooks": self.hooks.stats() if self.hooks is not None else None}
 
-    def start_break(self):
-        """Start a break."""
-        # Stop the main timer updates
-        if self.timer_id:
+    def _start_control_server(self):
+        try:
+            from cvshield_control import ControlServer
+            server = ControlServer(self._dispatch_control_command, clock=self.scheduler.clock,
+                                   extra_status=self._extra_status)
+            server.start()
+        except Exception as e:
+            print(f"CVShield: control socket unavailable: {e}", file=sys.stderr)
+            return
+        self.control_server = server
+        self._publish_status(self.scheduler, EVENT_STATE)
+
+    def _start_hooks(self):
+        from cvshield_hooks import HookRunner
+        self.hooks = HookRunner()
+        self.hooks.load_entry_points()
+        self._configure_hooks()
+
+    def _configure_hooks(self):
+        """(Re)build the hooks defined in the settings; plugin hooks are found once."""
+        from cvshield_hooks import Hook
+        hooks = []
+        for config in self.hook_configs or []:
             try:
-                self.root.after_cancel(self.timer_id)
-            except Exception:
-                pass
-            self.timer_id = None
+                hooks.append(Hook.from_config(config))
+            except Exception as e:
+                print(f"CVShield: ignoring hook {config!r}: {e}", file=sys.stderr)
+        self.hooks.configure(hooks)
+
+    def _fire_hooks(self, event, **payload):
+        """Hand ``event`` to the hook workers; returns at once."""
+        if self.hooks is None:
+            return
+        payload.update(at=time.time(), break_interval=self.break_interval, break_duration=self.break_duration)
+        self.hooks.fire(event, payload)
 
+    def _dispatch_control_command(self, command):
+        """Called on the socket thread; the work itself runs on the Tk thread."""
+        self.commands.post(self.controller.run_command, command)
+
+    def start_break(self):
+        """Start a break."""
         # Update UI to show break state
         self.timer_label.config(text="😎 CVShield - Break!")
-        if self.icon:
-            self.icon.title = "CVShield - Break!"
 
-        # Pause the main timer during break
-        self.is_timer_running = False
+        schedule = self.scheduler.current_schedule
+        self._fire_hooks("break_start", break_length=self.scheduler.break_length or self.break_duration,
+                         schedule=schedule.name if schedule else None)
 
         # Define callback to run after break finishes
         def on_break_end():
-            # Reset the main timer starting point so it counts a full interval after break
-            self.start_time = time.time()
-            self.is_timer_running = True
-            self.timer_id = self.root.after(1000, self.track_time)
-            self.timer_label.config(text="😎 CVShield - Timer Running")
-            if self.icon:
-                self.icon.title = "CVShield - Timer Running"
+            self._fire_hooks("break_end", break_length=self.scheduler.break_length)
+            # The scheduler already restarted the work period when the break ended
+            if self.scheduler.state == WORKING:
+                self.timer_label.config(text="😎 CVShield - Timer Running")
+                self._schedule_tick()
 
         # Start the break and pass the callback
         self.block_screen_for_break(self.break_duration, on_complete=on_break_end)
 
+    def _ensure_break_frame(self):
+        if self.break_frame is None:
+            self.setup_break_frame()
+
+    def _ensure_preferences_frame(self):
+        if self.pref_frame is None:
+            self.setup_preferences_frame()
+
     def setup_break_frame(self):
         """Create the break frame (initially hidden)."""
-        # Use a frame for the break UI. We'll place a background label into
-        # this frame at runtime when entering the break.
-        self.break_frame = ttk.Frame(self.container, padding="20")
-        
-        # Configure styles for break frame
-        style = ttk.Style()
-        style.configure("Break.TFrame", background='#ebf8ff')
-        # Make break text much larger so it's obvious during fullscreen breaks
-        style.configure("BreakTimer.TLabel",
-                       font=("Arial", 72, "bold"),
-                       foreground="#2b6cb0",
-                       background="#ebf8ff")
-        style.configure("Exercise.TLabel",
-                       font=("Arial", 36),
-                       foreground="#2d3748",
-                       background="#ebf8ff",
-                       wraplength=1000)
-        style.configure("Horizontal.TProgressbar",
-                       background="#4299e1",
-                       troughcolor="#e2e8f0")
-        
-        self.break_frame.configure(style="Break.TFrame")
-        
-        # Timer label with styling
-        self.break_timer_label = ttk.Label(
-            self.break_frame,
-            text="",
-            style="BreakTimer.TLabel"
-        )
-        self.break_timer_label.pack(pady=25)
-        
-        # Exercise label with styling
-        self.exercise_label = ttk.Label(
-            self.break_frame,
-            text="",
-            style="Exercise.TLabel"
-        )
-        self.exercise_label.pack(pady=25)
-        
-        # Progress bar
-        self.progress_var = tk.DoubleVar()
-        self.progress_bar = ttk.Progressbar(
-            self.break_frame,
-            length=600,
-            mode='determinate',
-            variable=self.progress_var
-        )
-        self.progress_bar.pack(pady=20)
+        from cvshield_break_screen import BreakScreen
+
+        # A single canvas draws the background, countdown and progress bar
+        self.break_screen = BreakScreen(self.container)
+        self.break_frame = self.break_screen.canvas
 
-        # Placeholders for optional scenery background used during breaks
-        # These are created/destroyed at break time so we don't hold image
-        # references when not needed.
-        self._break_bg_image = None
-        self._break_bg_label = None
         # Store previous window state so we can restore after fullscreen break
         self._prev_geometry = None
         self._was_fullscreen = False
@@ -556,6 +978,9 @@ class CVShield:
         self.break_duration = seconds
         msg = self.pref_message_var.get().strip()
         self.custom_pause_message = msg if msg else "Please take a short break!"
+        # Apply to a running cycle without restarting it
+        self.scheduler.configure(self.break_interval, self.break_duration)
+        self._schedule_tick()
 
         # Signal waiting caller and return to main frame
         if isinstance(self._pref_result_var, tk.Variable):
@@ -585,6 +1010,89 @@ class CVShield:
 
         on_complete: optional callback invoked (in the GUI thread) after the break finishes.
         """
+        self._break_screen_active = True
+        monitors = self._break_monitors() if self.multi_monitor else []
+        sizes = [(m.width, m.height) for m in monitors] or [self._screen_size()]
+
+        # Use the assets prepared ahead of the deadline (or prepare them now)
+        scenery_path = self._scenery_path()
+        plan = self._render_plan(sizes)
+        schedule = self.scheduler.current_schedule if self.scheduler.state == ON_BREAK else None
+        self._exercise_schedule = schedule
+        prepared = self.prefetcher.take(scenery_path, [entry[0] for entry in plan.values() if entry])
+        exercise = prepared.exercise
+        if schedule is not None and schedule.message:
+            exercise = f"{schedule.message}\n\n{exercise}"
+        images = prepared.images
+        if self.break_background == "desktop":
+            # Grabbed before anything of ours covers the screen; the photo is the fallback
+            images = self.prefetcher.capture_desktop(self._desktop_regions(monitors, plan),
+                                                     self.desktop_capture_timeout) or images
+        # The next break rotates to a new photo (and re-reads the monitor layout)
+        self._next_scenery = None
+        self._next_monitors = None
+
+        # One PhotoImage per distinct resolution, shared by same-sized monitors
+        self._break_bg_images = {}
+        try:
+            if images:
+                from PIL import ImageTk
+                # Only the PhotoImage handoff happens on the Tk thread
+                for size, entry in plan.items():
+                    image = images.get(entry[0]) if entry else None
+                    if image is None:
+                        continue
+                    photo = ImageTk.PhotoImage(image)
+                    if entry[1] > 1:
+                        photo = self._zoom_photo(photo, entry[1])
+                    self._break_bg_images[size] = photo
+        except Exception:
+            # If background load fails for any reason, ignore and continue
+            self._release_break_images()
+        # The PIL frames are not needed once Tk has its copy
+        prepared = images = None
+        from cvshield_imaging import PHOTO_BYTES_PER_PIXEL
+        self.last_break_image_bytes = sum(photo.width() * photo.height() * PHOTO_BYTES_PER_PIXEL
+                                          for photo in self._break_bg_images.values())
+
+        if monitors:
+            self._show_monitor_overlays(monitors, exercise)
+        else:
+            self._show_fullscreen_break(exercise, self._break_bg_images.get(sizes[0]))
+
+        self._on_break_complete = on_complete
+        if self.scheduler.state != ON_BREAK:
+            self.scheduler.start_break(break_duration)
+        # Text changes once a second; the bar wakes at most MAX_PROGRESS_FPS times a second
+        self.scheduler.progress_resolution = self._break_screens[0].progress_steps(self.scheduler.break_length)
+        self.update_break_timer()
+        self._schedule_tick()
+        # Idle callbacks run after Tk's pending redraws, i.e. once the frame is up
+        self.root.after_idle(self._record_break_latency)
+
+    @staticmethod
+    def _desktop_regions(monitors, plan):
+        """Map each render size in ``plan`` to (screen bbox, render size) for the capture.
+
+        Same-sized monitors share one background, as with the scenery, so the
+        first monitor of each size provides it. Without overlays the whole
+        screen is used.
+        """
+        regions = {}
+        for size, entry in plan.items():
+            if not entry:
+                continue
+            bbox = None
+            for m in monitors:
+                if (m.width, m.height) == size:
+                    bbox = (m.x, m.y, m.x + m.width, m.y + m.height)
+                    break
+            regions[entry[0]] = (bbox, entry[0])
+        return regions
+
+    def _show_fullscreen_break(self, exercise, background):
+        """Show the break on the main window, fullscreen on its monitor."""
+        self._ensure_break_frame()
         # Store and change window state to fullscreen so the break is prominent.
         try:
             # Save geometry and fullscreen/state so we can restore later
@@ -626,139 +1134,204 @@ class CVShield:
         # Hide main frame and show break frame
         self.main_frame.pack_forget()
         self.break_frame.pack(fill='both', expand=True)
-        
-        # Update exercise text
-        exercise_text = random.choice(self.eye_exercises)
-        self.exercise_label.config(text=exercise_text)
-        
-        # Reset progress bar
-        self.progress_var.set(0)
-        
-        # Try to place the scenic background image (scenery.jpg) stretched to screen
+        self.break_screen.show(exercise, background)
+        self._break_screens = [self.break_screen]
+
+    def _show_monitor_overlays(self, monitors, exercise):
+        """Cover every monitor with its own borderless break overlay."""
+        from cvshield_break_screen import BreakScreen
+
+        self._break_overlays = []
+        self._break_screens = []
+        for monitor in monitors:
+            overlay = tk.Toplevel(self.root)
+            overlay.overrideredirect(True)
+            overlay.geometry(f"{monitor.width}x{monitor.height}+{monitor.x}+{monitor.y}")
+            try:
+                overlay.attributes("-topmost", True)
+            except Exception:
+                pass
+            screen = BreakScreen(overlay)
+            screen.canvas.pack(fill='both', expand=True)
+            screen.show(exercise, self._break_bg_images.get((monitor.width, monitor.height)))
+            self._break_overlays.append(overlay)
+            self._break_screens.append(screen)
         try:
-            base_dir = os.path.dirname(os.path.abspath(__file__))
-            # Prefer images/scenery.jpg inside the repository
-            scenery_path = os.path.join(base_dir, 'images', 'scenery.jpg')
-            if os.path.exists(scenery_path):
-                # Resize to current screen size
-                screen_w = self.root.winfo_screenwidth()
-                screen_h = self.root.winfo_screenheight()
-                img = Image.open(scenery_path).convert('RGBA')
-                img = img.resize((screen_w, screen_h), Image.LANCZOS)
-                self._break_bg_image = ImageTk.PhotoImage(img)
-                # If an existing label exists, replace its image; otherwise create one
-                if self._break_bg_label:
-                    try:
-                        self._break_bg_label.config(image=self._break_bg_image)
-                    except Exception:
-                        self._break_bg_label = tk.Label(self.break_frame, image=self._break_bg_image)
-                        self._break_bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-                else:
-                    self._break_bg_label = tk.Label(self.break_frame, image=self._break_bg_image)
-                    self._break_bg_label.place(x=0, y=0, relwidth=1, relheight=1)
-                # Ensure UI elements are on top of the background
+            self._break_overlays[0].focus_force()
+        except Exception:
+            pass
+
+    def _break_monitors(self):
+        """Monitor layout for the next break, detected once per break."""
+        if self._next_monitors is None:
+            from cvshield_monitors import detect_monitors
+            try:
+                self._next_monitors = detect_monitors(self.root.winfo_screen())
+            except Exception:
+                self._next_monitors = []
+        return self._next_monitors
+
+    def _record_break_latency(self):
+        """Record how long after its deadline the break became visible."""
+        due = self.scheduler.break_due
+        if due is not None:
+            self.prefetcher.record_latency(max(0.0, self.scheduler.clock() - due))
+
+    def _scenery_path(self):
+        """Return the next break background path, or None if there is none.
+
+        The choice is remembered until the break is shown so the prefetch
+        and the break itself agree on the same photo.
+        """
+        if self._next_scenery is None:
+            path = None
+            if self.scenery_dir:
+                if self.scenery_library is None or self.scenery_library.directory != self.scenery_dir:
+                    self.scenery_library = SceneryLibrary(self.scenery_dir, order=self.scenery_order)
+                self.scenery_library.order = self.scenery_order
+                path = self.scenery_library.next_path()
+            if path is None:
+                base_dir = os.path.dirname(os.path.abspath(__file__))
+                # Prefer images/scenery.jpg inside the repository
+                path = os.path.join(base_dir, 'images', 'scenery.jpg')
+                if not os.path.exists(path):
+                    return None
+            self._next_scenery = path
+        return self._next_scenery
+
+    def _screen_size(self):
+        return (self.root.winfo_screenwidth(), self.root.winfo_screenheight())
+
+    def _prefetch_break(self):
+        """Decode and scale the next break's assets on the worker thread."""
+        monitors = self._break_monitors() if self.multi_monitor else []
+        sizes = [(m.width, m.height) for m in monitors] or [self._screen_size()]
+        plan = self._render_plan(sizes)
+        self._exercise_schedule = self.scheduler.upcoming_break()
+        self.prefetcher.prefetch(self._scenery_path(), [entry[0] for entry in plan.values() if entry])
+
+    def _render_plan(self, sizes):
+        """Map each display size to (render size, zoom factor), or None for no image.
+
+        Without a break memory cap every size renders at full resolution.
+        With one, the cap is shared between sizes by area, and sizes that
+        do not fit are rendered smaller and zoomed up by Tk, which never
+        holds a full-size RGB copy.
+        """
+        from cvshield_imaging import budget_scale_factor, reduced_size
+        budget = self.break_memory_mb * 1024 * 1024
+        distinct = list(dict.fromkeys(tuple(size) for size in sizes))
+        total_area = sum(w * h for w, h in distinct) or 1
+        plan = {}
+        for size in distinct:
+            share = budget * size[0] * size[1] // total_area
+            factor = budget_scale_factor(size, share)
+            plan[size] = None if factor is None else (reduced_size(size, factor), factor)
+        return plan
+
+    def _zoom_photo(self, photo, factor):
+        """Return a new Tk photo of ``photo`` enlarged ``factor`` times."""
+        zoomed = tk.PhotoImage(master=self.root, width=photo.width() * factor,
+                               height=photo.height() * factor)
+        zoomed.tk.call(str(zoomed), 'copy', str(photo), '-zoom', factor, factor)
+        # Free the small photo now rather than whenever it is collected
+        self._delete_photo(photo)
+        return zoomed
+
+    def _delete_photo(self, photo):
+        try:
+            self.root.tk.call('image', 'delete', str(photo))
+        except Exception:
+            pass
+
+    def _release_break_images(self):
+        """Free every break background now, even if a reference lingers."""
+        images, self._break_bg_images = self._break_bg_images, {}
+        for photo in images.values():
+            self._delete_photo(photo)
+
+    def update_break_timer(self):
+        """Render the break countdown and progress from the scheduler."""
+        remaining_time = self.scheduler.remaining()
+        if remaining_time is None:
+            return
+        progress = self.scheduler.break_progress()
+        for screen in self._break_screens:
+            screen.update(remaining_time, progress)
+
+    def _finish_break_screen(self):
+        """Tear down the break screen and restore the main window."""
+        self._break_screen_active = False
+        # Drop the scenic backgrounds from the canvases and clear image refs
+        try:
+            for screen in self._break_screens:
                 try:
-                    self.break_timer_label.lift()
-                    self.exercise_label.lift()
-                    self.progress_bar.lift()
+                    screen.clear()
                 except Exception:
                     pass
-        except Exception:
-            # If background load fails for any reason, ignore and continue
-            self._break_bg_image = None
-            self._break_bg_label = None
+        finally:
+            self._break_screens = []
+            self._release_break_images()
 
-        start_time = time.time()
-        
-        def update_break_timer():
-            elapsed_time = time.time() - start_time
-            remaining_time = max(0, break_duration - elapsed_time)
-            
-            if remaining_time <= 0:
-                # Remove scenic background label if it exists and clear image refs
+        if self._break_overlays:
+            for overlay in self._break_overlays:
                 try:
-                    if self._break_bg_label:
-                        # Clear image first to avoid platform-specific issues
-                        try:
-                            self._break_bg_label.config(image='')
-                        except Exception:
-                            pass
+                    overlay.destroy()
+                except Exception:
+                    pass
+            self._break_overlays = []
+        else:
+            self._restore_main_window()
+
+        # Run callback (if provided) in mainloop
+        on_complete, self._on_break_complete = self._on_break_complete, None
+        if callable(on_complete):
+            try:
+                self.root.after(0, on_complete)
+            except Exception:
+                try:
+                    on_complete()
+                except Exception:
+                    pass
+
+    def _restore_main_window(self):
+        """Leave the fullscreen break frame and restore the main window."""
+        self.break_frame.pack_forget()
+        self.main_frame.pack(fill='both', expand=True)
+
+        # Restore previous window state (exit fullscreen and restore geometry/state)
+        try:
+            # First, explicitly turn off fullscreen (safer across platforms)
+            try:
+                self.root.attributes("-fullscreen", False)
+            except Exception:
+                pass
+            # Restore window state if it was changed (e.g., zoomed)
+            try:
+                if isinstance(self._prev_state, dict):
+                    prev_state = self._prev_state.get('state')
+                    prev_geom = self._prev_state.get('geometry')
+                    if prev_state and prev_state != 'normal':
                         try:
-                            self._break_bg_label.destroy()
+                            self.root.state(prev_state)
                         except Exception:
                             try:
-                                self._break_bg_label.place_forget()
+                                self.root.state('normal')
                             except Exception:
                                 pass
-                        self._break_bg_label = None
-                        self._break_bg_image = None
-                except Exception:
-                    pass
-
-                self.break_frame.pack_forget()
-                self.main_frame.pack(fill='both', expand=True)
-
-                # Restore previous window state (exit fullscreen and restore geometry/state)
-                try:
-                    # First, explicitly turn off fullscreen (safer across platforms)
-                    try:
-                        self.root.attributes("-fullscreen", False)
-                    except Exception:
-                        pass
-                    # Restore window state if it was changed (e.g., zoomed)
-                    try:
-                        if isinstance(self._prev_state, dict):
-                            prev_state = self._prev_state.get('state')
-                            prev_geom = self._prev_state.get('geometry')
-                            if prev_state and prev_state != 'normal':
-                                try:
-                                    self.root.state(prev_state)
-                                except Exception:
-                                    try:
-                                        self.root.state('normal')
-                                    except Exception:
-                                        pass
-                            if prev_geom:
-                                try:
-                                    self.root.geometry(prev_geom)
-                                except Exception:
-                                    pass
-                    except Exception:
-                        # As a final fallback, attempt to normalize the window
+                    if prev_geom:
                         try:
-                            self.root.state('normal')
+                            self.root.geometry(prev_geom)
                         except Exception:
                             pass
+            except Exception:
+                # As a final fallback, attempt to normalize the window
+                try:
+                    self.root.state('normal')
                 except Exception:
                     pass
-                # Run callback (if provided) in mainloop
-                if callable(on_complete):
-                    try:
-                        self.root.after(0, on_complete)
-                    except Exception:
-                        try:
-                            on_complete()
-                        except Exception:
-                            pass
-                return
-            
-            minutes, seconds = divmod(int(remaining_time), 60)
-            if minutes > 0:
-                timer_text = f"{minutes}:{seconds:02d}"
-            else:
-                timer_text = f"{seconds} seconds"
-                
-            self.break_timer_label.config(text=f"Time remaining: {timer_text}")
-            
-            # Update progress bar
-            progress = ((break_duration - remaining_time) / break_duration) * 100
-            self.progress_var.set(progress)
-            
-            self.root.after(100, update_break_timer)
-        
-        # Start the timer update
-        update_break_timer()
-
+        except Exception:
+            pass
     def ensure_settings_exist(self):
         """Ensure break settings are set, asking the user if necessary."""
         if not self.load_settings() or self.break_interval == 0 or self.break_duration == 0:
@@ -767,25 +1340,135 @@ class CVShield:
 
     def save_settings(self):
         """Save settings to a file."""
-        settings = {
+        # Coalesced and written atomically; unchanged settings cost nothing
+        self.settings_store.save(self._settings_dict())
+
+    def _settings_dict(self):
+        return {
             "break_interval": self.break_interval,
             "break_duration": self.break_duration,
             "custom_pause_message": self.custom_pause_message,
+            "prewarm_seconds": self.prewarm_seconds,
+            "scenery_dir": self.scenery_dir,
+            "scenery_order": self.scenery_order,
+            "image_cache_mb": self.image_cache_mb,
+            "break_memory_mb": self.break_memory_mb,
+            "break_background": self.break_background,
+            "hooks": self.hook_configs,
+            "exercise_locale": self.exercise_locale,
+            "idle_pause_seconds": self.idle_pause_seconds,
+            "multi_monitor": self.multi_monitor,
+            "schedules": self.schedule_configs,
+            "coalesce_seconds": self.coalesce_seconds,
         }
-        with open(self.SETTINGS_FILE, "w") as file:
-            json.dump(settings, file)
 
     def load_settings(self):
         """Load settings from a file."""
-        try:
-            with open(self.SETTINGS_FILE, "r") as file:
-                settings = json.load(file)
-                self.break_interval = settings.get("break_interval", 0)
-                self.break_duration = settings.get("break_duration", 0)
-                self.custom_pause_message = settings.get("custom_pause_message", "Please take a short break!")
-                return True
-        except (FileNotFoundError, json.JSONDecodeError):
+        settings = self.settings_store.load()
+        if settings is None:
             return False
+        self._apply_settings(settings)
+        return True
+
+    def _apply_settings(self, settings):
+        self.break_interval = settings.get("break_interval", 0)
+        self.break_duration = settings.get("break_duration", 0)
+        self.custom_pause_message = settings.get("custom_pause_message", "Please take a short break!")
+        self.prewarm_seconds = settings.get("prewarm_seconds", 10)
+        self.scenery_dir = settings.get("scenery_dir")
+        self.scenery_order = settings.get("scenery_order", "shuffle")
+        self.image_cache_mb = settings.get("image_cache_mb", 128)
+        self.idle_pause_seconds = settings.get("idle_pause_seconds", 300)
+        self.multi_monitor = settings.get("multi_monitor", False)
+        self.break_memory_mb = settings.get("break_memory_mb", 0)
+        self.break_background = settings.get("break_background", "scenery")
+        self.hook_configs = settings.get("hooks", [])
+        if self.hooks is not None:
+            self._configure_hooks()
+        self.schedule_configs = settings.get("schedules", [])
+        self.coalesce_seconds = settings.get("coalesce_seconds", 60)
+        self._configure_schedules()
+        self.exercise_locale = settings.get("exercise_locale")
+        if self.exercise_locale and self.exercise_locale != self.exercise_catalog.locale:
+            self.exercise_catalog = ExerciseCatalog(locale=self.exercise_locale)
+        if self._render_cache is not None:
+            self._render_cache.set_memory_budget(self._image_cache_bytes())
+
+    def _configure_schedules(self):
+        """Hand the scheduler the named schedules from the settings, if any."""
+        schedules = []
+        for config in self.schedule_configs or []:
+            try:
+                schedules.append(schedule_from_config(config))
+            except ValueError as e:
+                print(f"CVShield: ignoring schedule {config!r}: {e}", file=sys.stderr)
+        self.scheduler.set_schedules(schedules, coalesce_window=self.coalesce_seconds)
+
+    def _start_settings_watch(self):
+        from cvshield_settings import SettingsWatcher
+        try:
+            self.settings_watcher = SettingsWatcher(self.settings_store.path)
+        except OSError:
+            return
+        fd = self.settings_watcher.fileno()
+        if fd is not None:
+            self.root.tk.createfilehandler(fd, tk.READABLE, lambda fd, mask: self._settings_file_event())
+        else:
+            self._settings_watch_id = self.root.after(
+                int(self.settings_watcher.interval * 1000), self._poll_settings_file)
+
+    def _stop_settings_watch(self):
+        if self.settings_watcher is None:
+            return
+        fd = self.settings_watcher.fileno()
+        if fd is not None:
+            try:
+                self.root.tk.deletefilehandler(fd)
+            except Exception:
+                pass
+        if self._settings_watch_id is not None:
+            try:
+                self.root.after_cancel(self._settings_watch_id)
+            except Exception:
+                pass
+            self._settings_watch_id = None
+        self.settings_watcher.close()
+        self.settings_watcher = None
+
+    def _settings_file_event(self):
+        # One save is several inotify events; reload once they have settled
+        if self.settings_watcher.changed() and self._settings_watch_id is None:
+            self._settings_watch_id = self.root.after(100, self._reload_settings)
+
+    def _poll_settings_file(self):
+        if self.settings_watcher.changed():
+            self._reload_settings()
+        self._settings_watch_id = self.root.after(
+            int(self.settings_watcher.interval * 1000), self._poll_settings_file)
+
+    def _reload_settings(self):
+        """Apply settings changed on disk to the running app, keeping the current cycle."""
+        if self.settings_watcher is not None and self.settings_watcher.fileno() is not None:
+            self._settings_watch_id = None
+        changed = self.settings_store.read_if_changed()
+        if changed is None:
+            # Our own save, or a file that is not readable yet
+            return
+        # Keys the file leaves out keep their current values
+        settings = self._settings_dict()
+        settings.update(changed)
+        if not settings.get("break_interval") or not settings.get("break_duration"):
+            return
+        self._apply_settings(settings)
+        self.scheduler.configure(self.break_interval, self.break_duration)
+        self.scheduler.prewarm_lead = self.prewarm_seconds
+        if self.idle_monitor is not None:
+            self.idle_monitor.threshold = self.idle_pause_seconds
+        self.update_preferences_display()
+        if self.is_timer_running:
+            # A shorter interval may already be due
+            self._schedule_tick()
+        self._publish_status(self.scheduler, EVENT_STATE)
 
     def get_valid_input(self, prompt, min_val, max_val):
         """Prompt the user for valid input within a range."""
@@ -836,6 +1519,7 @@ class CVShield:
 
     def set_initial_break_settings(self):
         """Show the in-window preferences UI and require the user to save initial settings."""
+        self._ensure_preferences_frame()
         # Show preferences frame as modal-ish and require save
         # Populate fields with sensible defaults if empty
         if self.break_interval and self.break_interval > 0:
@@ -850,7 +1534,8 @@ class CVShield:
 
         # Hide other frames and show prefs
         self.main_frame.pack_forget()
-        self.break_frame.pack_forget()
+        if self.break_frame is not None:
+            self.break_frame.pack_forget()
         self.pref_frame.pack(fill='both', expand=True)
 
         # Prepare variable to wait on
@@ -876,6 +1561,7 @@ class CVShield:
 
     def edit_break(self, _=None):
         """Allow the user to temporarily edit break settings for the current session."""
+        self._ensure_preferences_frame()
         # Show preferences in same window for temporary edit
         # Populate current values
         self.pref_interval_var.set(str(self.break_interval // 60 if self.break_interval else 20))
@@ -945,6 +1631,7 @@ class CVShield:
 
     def edit_preferences(self, _=None):
         """Allow the user to edit their preferences."""
+        self._ensure_preferences_frame()
         # Populate fields with current values
         self.pref_interval_var.set(str(self.break_interval // 60 if self.break_interval else 20))
         self.pref_duration_var.set(str(self.break_duration if self.break_duration else 30))
@@ -963,7 +1650,51 @@ class CVShield:
         self.update_preferences_display()
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv[:1] == ["ctl"]:
+        # Client for a running instance; no window is created
+        import cvshield_control
+        return cvshield_control.main(argv[1:])
+    if argv[:1] == ["serve"]:
+        # Headless scheduler for many users (thin clients, VDI)
+        import cvshield_server
+        return cvshield_server.main(argv[1:])
+    if argv[:1] == ["simulate"]:
+        # Replays an activity trace in virtual time; no window is created
+        import cvshield_simulate
+        return cvshield_simulate.main(argv[1:])
+    parser = argparse.ArgumentParser(prog="CVShield", description="Eye health and break timer")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="print a per-phase startup timing breakdown and exit")
+    parser.add_argument("--trace", action="store_true",
+                        help="record Tk callbacks and timer transitions; save with SIGUSR1, "
+                             "the tray menu, or on exit")
+    parser.add_argument("--trace-events", type=int, default=100000,
+                        help="trace ring buffer size in events (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    profile = StartupProfile() if args.startup_profile else None
+    tracer = None
+    if args.trace:
+        from cvshield_trace import Tracer
+        tracer = Tracer(args.trace_events)
     # Create and run the application without system tray initially
-    app = CVShield()
-    app.root.mainloop()
\ No newline at end of file
+    app = CVShield(startup_profile=profile, tracer=tracer, exit_after_startup=args.startup_profile)
+    if tracer and hasattr(signal, "SIGUSR1"):
+        # Without the wakeup the handler would wait for the next Tk event
+        app.commands.wake_on_signals()
+        signal.signal(signal.SIGUSR1, lambda signum, frame: app.commands.post(app.save_trace))
+    app.root.mainloop()
+    # Don't lose a change still waiting in the coalescing window
+    app.settings_store.flush()
+    app._write_exit_checkpoint()
+    app.history.close()
+    if app.control_server is not None:
+        app.control_server.close()
+    app.save_trace()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""Benchmarks for the CVShield desktop app's hot paths.
+
+Measures startup time, CPU per hour while idle and while counting down,
+CPU and wakeups per hour with the window shown and minimized to the tray,
+the cost of one ``track_time`` tick, the preferences round trip, the
+latency of commands posted from another thread while the Tk loop is busy,
+and the deadline-to-break-frame latency and peak RSS at 1080p, 1440p and 4K.
+
+Each measurement runs in a fresh process with private XDG directories, on a
+private Xvfb server sized for the resolution under test, so nothing touches
+the user's settings, history or display and no network is needed::
+
+    python benchmarks/bench_app.py --output results.json
+    python benchmarks/bench_app.py --baseline baseline.json   # exit 1 on regression
+
+Every metric is "lower is better". Without Xvfb on PATH the current
+``$DISPLAY`` is used and only its own resolution is measured.
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RESOLUTIONS = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+}
+
+
+# -- workers (run inside the child process) ------------------------------
+
+def _make_app(break_interval=3600, break_duration=30, prewarm_seconds=10, profile=False):
+    """Build the app against the settings written by the runner.
+
+    With ``profile`` the startup phases are recorded; the app keeps running
+    either way (only ``--startup-profile`` exits after startup).
+    """
+    sys.path.insert(0, REPO)
+    import CVShield
+    app = CVShield.CVShield(startup_profile=CVShield.StartupProfile() if profile else None)
+    app.break_interval = break_interval
+    app.break_duration = break_duration
+    app.prewarm_seconds = prewarm_seconds
+    return app
+
+
+def _wait_until_mapped(app, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not app.root.winfo_ismapped() and time.monotonic() < deadline:
+        app.root.update()
+    app.root.update()
+
+
+def _run_loop(app, seconds):
+    app.root.after(int(seconds * 1000), app.root.quit)
+    app.root.mainloop()
+
+
+def worker_startup(args):
+    start = time.perf_counter()
+    app = _make_app(profile=True)
+    profile = app.startup_profile
+    _wait_until_mapped(app)
+    mapped = time.perf_counter()
+    marks = {phase: (stamp - profile.origin) * 1000 for phase, stamp in profile.marks}
+    result = {
+        "startup_ms": (mapped - profile.origin) * 1000,
+        "init_ms": (mapped - start) * 1000,
+    }
+    result.update({"phase_%s_ms" % phase: value for phase, value in marks.items()})
+    app.root.destroy()
+    return result
+
+
+def worker_cpu(args):
+    app = _make_app()
+    _wait_until_mapped(app)
+    # Let startup work (tray, control socket) settle before measuring
+    _run_loop(app, 1.0)
+    result = {}
+    for mode in ("idle", "counting"):
+        if mode == "counting":
+            app.start_timer()
+        cpu_start, wall_start = time.process_time(), time.monotonic()
+        _run_loop(app, args.seconds)
+        cpu = time.process_time() - cpu_start
+        wall = time.monotonic() - wall_start
+        result["%s_cpu_s_per_hour" % mode] = cpu / wall * 3600
+    app.root.destroy()
+    return result
+
+
+def worker_hidden(args):
+    """CPU and timer wakeups per hour, window shown vs minimized to the tray."""
+    app = _make_app()
+    _wait_until_mapped(app)
+    app.start_timer()
+    wakeups = [0]
+    track_time = app.track_time
+
+    def counted():
+        wakeups[0] += 1
+        track_time()
+    app.track_time = counted
+    app._schedule_tick()
+    result = {}
+    for mode in ("visible", "hidden"):
+        if mode == "hidden":
+            app.minimize_to_tray()
+        wakeups[0] = 0
+        cpu_start, wall_start = time.process_time(), time.monotonic()
+        _run_loop(app, args.seconds)
+        wall = time.monotonic() - wall_start
+        result["%s_cpu_s_per_hour" % mode] = (time.process_time() - cpu_start) / wall * 3600
+        result["%s_wakeups_per_hour" % mode] = wakeups[0] / wall * 3600
+    app.root.destroy()
+    return result
+
+
+def worker_tick(args):
+    app = _make_app()
+    _wait_until_mapped(app)
+    app.start_timer()
+    count = 2000
+    start = time.perf_counter()
+    for _ in range(count):
+        app.track_time()
+    elapsed = time.perf_counter() - start
+    app.root.destroy()
+    return {"tick_us": elapsed / count * 1e6}
+
+
+def worker_prefs(args):
+    app = _make_app()
+    _wait_until_mapped(app)
+    timings = []
+    for _ in range(21):
+        # Press Save as soon as the preferences frame is up
+        app.root.after_idle(app._on_pref_save)
+        start = time.perf_counter()
+        app.edit_preferences()
+        app.root.update()
+        timings.append((time.perf_counter() - start) * 1000)
+    app.root.destroy()
+    return {"prefs_first_ms": timings[0], "prefs_ms": statistics.median(timings[1:])}
+
+
+def worker_commands(args):
+    """Latency of commands posted from another thread (as the tray does) under load."""
+    import threading
+    app = _make_app()
+    _wait_until_mapped(app)
+    app.start_timer()
+
+    def busy():
+        # Keep the Tk loop about half occupied with 4 ms callbacks
+        start = time.perf_counter()
+        while time.perf_counter() - start < 0.004:
+            pass
+        app.root.after(4, busy)
+
+    def producer():
+        for _ in range(500):
+            app.commands.post(app.scheduler.remaining)
+            time.sleep(0.005)
+        app.commands.post(app.root.quit)
+
+    app.root.after(0, busy)
+    threading.Thread(target=producer, daemon=True).start()
+    app.root.mainloop()
+    samples = sorted(app.commands.latencies)
+    app.root.destroy()
+    return {
+        "command_p50_ms": samples[len(samples) // 2] * 1000,
+        "command_p99_ms": samples[int(len(samples) * 0.99)] * 1000,
+        "command_max_ms": samples[-1] * 1000,
+    }
+
+
+def worker_break(args):
+    # A short interval so the break fires soon; prewarm as the app would
+    app = _make_app(break_interval=5, break_duration=30, prewarm_seconds=args.prewarm)
+    _wait_until_mapped(app)
+    app.start_timer()
+    deadline = time.monotonic() + 30
+
+    def check():
+        if app.prefetcher.last_latency is not None or time.monotonic() > deadline:
+            # Give the frame a moment on screen so RSS includes the paint
+            app.root.after(500, app.root.quit)
+        else:
+            app.root.after(50, check)
+
+    app.root.after(50, check)
+    app.root.mainloop()
+    latency = app.prefetcher.last_latency
+    result = {
+        "latency_ms": None if latency is None else latency * 1000,
+        # ru_maxrss is in kilobytes on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    app.root.destroy()
+    return result
+
+
+WORKERS = {
+    "startup": worker_startup,
+    "cpu": worker_cpu,
+    "tick": worker_tick,
+    "prefs": worker_prefs,
+    "commands": worker_commands,
+    "hidden": worker_hidden,
+    "break": worker_break,
+}
+
+
+# -- runner --------------------------------------------------------------
+
+class Xvfb:
+    """A private Xvfb server for one resolution.
+
+    ``extra_screens`` adds (width, height) screens joined with Xinerama
+    into one desktop, side by side, as a multi-monitor setup appears.
+    """
+
+    def __init__(self, width, height, extra_screens=()):
+        self.width, self.height = width, height
+        self.extra_screens = list(extra_screens)
+        self.process = None
+        self.display = None
+
+    def __enter__(self):
+        read_fd, write_fd = os.pipe()
+        screens = ["-screen", "0", "%dx%dx24" % (self.width, self.height)]
+        if self.extra_screens:
+            screens.insert(0, "+xinerama")
+            for number, (width, height) in enumerate(self.extra_screens, 1):
+                screens += ["-screen", str(number), "%dx%dx24" % (width, height)]
+        # -displayfd lets Xvfb pick a free display number and report it
+        self.process = subprocess.Popen(
+            ["Xvfb", "-displayfd", str(write_fd)] + screens +
+            ["-nolisten", "tcp", "+extension", "MIT-SCREEN-SAVER"],
+            pass_fds=(write_fd,), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as fh:
+            number = fh.readline().strip()
+        if not number:
+            self.process.kill()
+            raise RuntimeError("Xvfb failed to start")
+        self.display = ":" + number
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        self.process.wait()
+
+
+def _run_worker(name, display, extra=(), seconds=10):
+    with tempfile.TemporaryDirectory(prefix="cvshield-bench-") as home:
+        env = dict(os.environ)
+        env["DISPLAY"] = display
+        for var in ("XDG_CONFIG_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_RUNTIME_DIR"):
+            env[var] = os.path.join(home, var.lower())
+            os.makedirs(env[var], mode=0o700)
+        # Existing settings, so no first-run dialog blocks the benchmark
+        settings_dir = os.path.join(env["XDG_CONFIG_HOME"], "cvshield")
+        os.makedirs(settings_dir)
+        with open(os.path.join(settings_dir, "cvshield_settings.json"), "w") as fh:
+            json.dump({"schema_version": 2, "break_interval": 1200, "break_duration": 30}, fh)
+        output = os.path.join(home, "result.json")
+        command = [sys.executable, os.path.abspath(__file__), "--worker", name,
+                   "--worker-output", output, "--seconds", str(seconds)] + list(extra)
+        subprocess.run(command, env=env, check=True, timeout=600, stdout=subprocess.DEVNULL)
+        with open(output) as fh:
+            return json.load(fh)
+
+
+def _displays(resolutions):
+    """Yield (label, display) pairs, starting Xvfb when it is available."""
+    if shutil.which("Xvfb"):
+        for label in resolutions:
+            with Xvfb(*RESOLUTIONS[label]) as server:
+                yield label, server.display
+    elif os.environ.get("DISPLAY"):
+        yield "current", os.environ["DISPLAY"]
+    else:
+        raise SystemExit("bench_app: needs Xvfb on PATH or a $DISPLAY")
+
+
+def run_suite(args):
+    metrics = {}
+    resolutions = args.resolutions.split(",")
+    for index, (label, display) in enumerate(_displays(resolutions)):
+        if index == 0:
+            # Resolution-independent measurements run once, on the first server
+            for name in ("startup", "tick", "prefs", "commands", "cpu", "hidden"):
+                for key, value in _run_worker(name, display, seconds=args.seconds).items():
+                    metrics["%s.%s" % (name, key)] = value
+        for prewarm in (0, 3):
+            variant = "prewarmed" if prewarm else "cold"
+            result = _run_worker("break", display, ["--prewarm", str(prewarm)])
+            for key, value in result.items():
+                metrics["break.%s.%s.%s" % (label, variant, key)] = value
+    return metrics
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(metrics, baseline, tolerance):
+    """Print metrics next to the baseline; return the names that regressed."""
+    regressions = []
+    print("%-48s %12s %12s %8s" % ("metric", "baseline", "current", "change"))
+    for name in sorted(metrics):
+        current, before = metrics[name], baseline.get(name)
+        if current is None or not before:
+            print("%-48s %12s %12s" % (name, before, current))
+            continue
+        change = current / before - 1
+        flag = ""
+        if change > tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print("%-48s %12.3f %12.3f %+7.1f%%%s" % (name, before, current, change * 100, flag))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CVShield app benchmarks")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against a previous results JSON")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown before a metric counts as a regression (default: %(default)s)")
+    parser.add_argument("--resolutions", default=",".join(RESOLUTIONS),
+                        help="comma-separated subset of %s" % ", ".join(RESOLUTIONS))
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="length of each CPU measurement (default: %(default)s)")
+    parser.add_argument("--worker", choices=WORKERS, help=argparse.SUPPRESS)
+    parser.add_argument("--worker-output", help=argparse.SUPPRESS)
+    parser.add_argument("--prewarm", type=float, default=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        result = WORKERS[args.worker](args)
+        with open(args.worker_output, "w") as fh:
+            json.dump(result, fh)
+        return 0
+
+    metrics = run_suite(args)
+    report = {
+        "benchmark": "app",
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "metrics": metrics,
+    }
+    if args.output:
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2, sort_keys=True)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["metrics"]
+        return 1 if compare(metrics, baseline, args.tolerance) else 0
+    print(json.dumps(metrics, indent=2, sort_keys=True))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
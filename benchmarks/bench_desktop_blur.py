@@ -0,0 +1,66 @@
+"""Blurred-desktop background: fast reduce-blur-upscale vs full-resolution blur.
+
+Uses a synthetic desktop-like frame, so it needs no display:
+
+    python benchmarks/bench_desktop_blur.py [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from cvshield_imaging import blur_fast, blur_naive  # noqa: E402
+
+RESOLUTIONS = {"1080p": (1920, 1080), "1440p": (2560, 1440), "4k": (3840, 2160)}
+
+
+def fake_desktop(size):
+    """Windows, text-like stripes and a gradient, roughly like a real desktop."""
+    image = Image.linear_gradient("L").resize(size).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    w, h = size
+    for i in range(12):
+        x, y = (i * 311) % w, (i * 197) % h
+        draw.rectangle([x, y, x + w // 3, y + h // 3], fill=(40 * i % 255, 90, 200 - 10 * i))
+        for line in range(0, h // 3, 18):
+            draw.line([x + 10, y + line, x + w // 4, y + line], fill=(250, 250, 250), width=2)
+    return image
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    metrics = {}
+    print("%-6s %10s %10s %8s" % ("", "naive ms", "fast ms", "speedup"))
+    for label, size in RESOLUTIONS.items():
+        desktop = fake_desktop(size)
+        naive = best_of(lambda: blur_naive(desktop, size), args.repeat)
+        fast = best_of(lambda: blur_fast(desktop, size), args.repeat)
+        metrics["%s.naive_ms" % label] = naive
+        metrics["%s.fast_ms" % label] = fast
+        print("%-6s %10.1f %10.1f %7.1fx" % (label, naive, fast, naive / fast))
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "desktop_blur", "metrics": metrics}, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
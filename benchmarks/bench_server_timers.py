@@ -0,0 +1,93 @@
+"""Schedule/cancel/fire cost of the multi-user scheduler from 1k to 100k timers.
+
+Runs against a fake clock, so it measures the data structure rather than
+asyncio sleeps:
+
+    python benchmarks/bench_server_timers.py [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cvshield_server import BreakService  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def per_op_us(fn, items):
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def bench(count, ops=1000, seed=1):
+    rng = random.Random(seed)
+    clock = FakeClock()
+    tracemalloc.start()
+    service = BreakService(clock=clock)
+    users = ["user%d" % i for i in range(count)]
+    for user in users:
+        timer = service.timer_for(user)
+        # Spread deadlines so the heap is genuinely mixed
+        timer.break_interval = rng.uniform(60, 3600)
+        service.start(user)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    sample = rng.sample(users, min(ops, count))
+    result = {"timers": count, "bytes_per_timer": memory / count}
+    result["schedule_us"] = per_op_us(service.start, sample)
+    result["cancel_us"] = per_op_us(service.stop, sample)
+    for user in sample:
+        service.start(user)
+
+    # Fire: advance just far enough for ``ops`` timers to come due
+    deadlines = sorted(t.deadline for t in service.timers.values() if t.deadline is not None)
+    clock.now = deadlines[min(ops, len(deadlines)) - 1]
+    start = time.perf_counter()
+    fired = service.fire()
+    result["fire_us"] = (time.perf_counter() - start) / max(1, fired) * 1e6
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results = [bench(int(size)) for size in args.sizes.split(",")]
+    print("%9s %12s %12s %12s %14s" % ("timers", "schedule us", "cancel us", "fire us", "bytes/timer"))
+    for r in results:
+        print("%9d %12.2f %12.2f %12.2f %14.0f" % (r["timers"], r["schedule_us"], r["cancel_us"],
+                                                  r["fire_us"], r["bytes_per_timer"]))
+    metrics = {"timers_%d.%s" % (r["timers"], key): value
+               for r in results for key, value in r.items() if key != "timers"}
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "server_timers", "metrics": metrics}, fh, indent=2, sort_keys=True)
+    if args.baseline:
+        from bench_app import compare
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)["metrics"]
+        return 1 if compare(metrics, baseline, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Timer wakeups per hour with the main window visible and hidden.
+
+Replays an hour of the work/break cycle on a virtual clock, with the same
+granularity the app uses in each mode, and counts the wakeups the Tk loop
+would get. Needs no display:
+
+    python benchmarks/bench_wakeups.py [--interval 1200] [--duration 30] [--json results.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cvshield_scheduler import BreakScheduler, EVENT_TICK, ON_BREAK  # noqa: E402
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def wakeups_per_hour(interval, duration, hidden, prewarm=10):
+    clock = FakeClock()
+    scheduler = BreakScheduler(interval, duration, clock=clock)
+    scheduler.prewarm_lead = prewarm
+    visible_changes = [0]
+
+    def on_event(sched, event):
+        # Same rule as CVShield._apply_power_mode
+        sched.granularity = 60.0 if hidden and sched.state != ON_BREAK else 1.0
+        if event == EVENT_TICK:
+            visible_changes[0] += 1
+
+    scheduler.subscribe(on_event)
+    scheduler.start()
+    wakeups = 0
+    while clock.now < 3600:
+        clock.now += scheduler.next_wakeup()
+        scheduler.poll()
+        wakeups += 1
+    return {"wakeups_per_hour": wakeups, "display_changes_per_hour": visible_changes[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--interval", type=float, default=1200, help="break interval in seconds")
+    parser.add_argument("--duration", type=float, default=30, help="break duration in seconds")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args(argv)
+
+    metrics = {}
+    for mode in ("visible", "hidden"):
+        result = wakeups_per_hour(args.interval, args.duration, mode == "hidden")
+        print("%-8s %6d wakeups/hour" % (mode, result["wakeups_per_hour"]))
+        metrics.update({"%s.%s" % (mode, key): value for key, value in result.items()})
+    if args.json:
+        with open(args.json, "w") as fh:
+            json.dump({"benchmark": "wakeups", "metrics": metrics}, fh, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
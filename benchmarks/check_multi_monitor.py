@@ -0,0 +1,118 @@
+"""Check multi-monitor detection and break overlays on a multi-screen Xvfb.
+
+Starts a private ``Xvfb +xinerama`` server with two screens side by side,
+checks that ``cvshield_monitors.detect_monitors`` reports both, then runs
+the app (with private XDG directories and ``multi_monitor`` on), starts a
+break and checks that each monitor got an overlay covering exactly it::
+
+    python benchmarks/check_multi_monitor.py
+    python benchmarks/check_multi_monitor.py --screens 2560x1440,1920x1080,1280x1024
+
+Exits 1 on a mismatch and 77 (skipped) when Xvfb is not on PATH.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_app import REPO, Xvfb
+
+SKIPPED = 77
+
+
+def _parse_screens(text):
+    screens = []
+    for item in text.split(","):
+        width, _, height = item.strip().partition("x")
+        screens.append((int(width), int(height)))
+    return screens
+
+
+def expected_geometries(screens):
+    """Xinerama places the screens left to right, top-aligned."""
+    geometries, x = [], 0
+    for width, height in screens:
+        geometries.append([x, 0, width, height])
+        x += width
+    return geometries
+
+
+def worker_overlays():
+    """Run in the child: start a break and report the overlay geometries."""
+    sys.path.insert(0, REPO)
+    import CVShield
+    app = CVShield.CVShield()
+    deadline = time.monotonic() + 10
+    while not app.root.winfo_ismapped() and time.monotonic() < deadline:
+        app.root.update()
+    app.multi_monitor = True
+    app.controller.run_command("break_now")
+    overlays = app._break_overlays
+    while not all(o.winfo_ismapped() for o in overlays) and time.monotonic() < deadline:
+        app.root.update()
+    app.root.update()
+    geometries = [[o.winfo_rootx(), o.winfo_rooty(), o.winfo_width(), o.winfo_height()] for o in overlays]
+    app.stop_timer()
+    app.root.destroy()
+    return geometries
+
+
+def _run_worker(display):
+    with tempfile.TemporaryDirectory(prefix="cvshield-check-") as home:
+        env = dict(os.environ, DISPLAY=display)
+        for var in ("XDG_CONFIG_HOME", "XDG_CACHE_HOME", "XDG_DATA_HOME", "XDG_RUNTIME_DIR"):
+            env[var] = os.path.join(home, var.lower())
+            os.makedirs(env[var], mode=0o700)
+        settings_dir = os.path.join(env["XDG_CONFIG_HOME"], "cvshield")
+        os.makedirs(settings_dir)
+        with open(os.path.join(settings_dir, "cvshield_settings.json"), "w") as fh:
+            json.dump({"schema_version": 2, "break_interval": 1200, "break_duration": 30,
+                       "multi_monitor": True}, fh)
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker"], env=env,
+                                check=True, timeout=120, capture_output=True, text=True).stdout
+        return json.loads(output.splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check CVShield's multi-monitor support under Xvfb")
+    parser.add_argument("--screens", default="1920x1080,1280x1024",
+                        help="comma-separated screen sizes, at least two (default: %(default)s)")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(worker_overlays()))
+        return 0
+
+    screens = _parse_screens(args.screens)
+    if len(screens) < 2:
+        parser.error("--screens needs at least two sizes")
+    if not shutil.which("Xvfb"):
+        print("check_multi_monitor: skipped, Xvfb is not on PATH")
+        return SKIPPED
+
+    sys.path.insert(0, REPO)
+    from cvshield_monitors import detect_monitors
+    expected = expected_geometries(screens)
+    failures = 0
+    with Xvfb(*screens[0], extra_screens=screens[1:]) as server:
+        checks = [
+            ("detected monitors", [[m.x, m.y, m.width, m.height] for m in detect_monitors(server.display)]),
+            ("break overlays", _run_worker(server.display)),
+        ]
+        for label, found in checks:
+            ok = found == expected
+            failures += not ok
+            print("%-18s %s  %s" % (label, "ok  " if ok else "FAIL", found))
+    if failures:
+        print("expected           %s" % expected)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Canvas-based break screen for CVShield.
+
+Everything on the break screen lives on one ``tk.Canvas``: the background is
+drawn once per break, and the countdown text and progress bar are separate
+canvas items that are only reconfigured when their visible value changes.
+Text is drawn straight onto the scenery with a soft shadow instead of in
+opaque label boxes.
+"""
+import tkinter as tk
+
+BREAK_BG = "#ebf8ff"
+TIMER_COLOR = "#2b6cb0"
+EXERCISE_COLOR = "#2d3748"
+SHADOW_COLOR = "#ffffff"
+BAR_COLOR = "#4299e1"
+TROUGH_COLOR = "#e2e8f0"
+
+# Upper bound on progress bar repaints per second
+MAX_PROGRESS_FPS = 10
+
+
+def format_break_remaining(remaining_time):
+    """Return the "Time remaining" text shown during a break."""
+    minutes, seconds = divmod(int(remaining_time), 60)
+    if minutes > 0:
+        timer_text = f"{minutes}:{seconds:02d}"
+    else:
+        timer_text = f"{seconds} seconds"
+    return f"Time remaining: {timer_text}"
+
+
+class BreakScreen:
+    """Full-window break display drawn on a single canvas."""
+
+    def __init__(self, parent, bar_length=600, bar_height=18):
+        self.canvas = tk.Canvas(parent, background=BREAK_BG, highlightthickness=0, borderwidth=0)
+        self.bar_length = bar_length
+        self.bar_height = bar_height
+        self._background = None
+        self._bg_item = self.canvas.create_image(0, 0, anchor="nw")
+        self._timer_shadow = self.canvas.create_text(0, 0, text="", fill=SHADOW_COLOR,
+                                                     font=("Arial", 72, "bold"))
+        self._timer_item = self.canvas.create_text(0, 0, text="", fill=TIMER_COLOR,
+                                                   font=("Arial", 72, "bold"))
+        self._exercise_shadow = self.canvas.create_text(0, 0, text="", fill=SHADOW_COLOR,
+                                                        font=("Arial", 36), width=1000,
+                                                        justify="center")
+        self._exercise_item = self.canvas.create_text(0, 0, text="", fill=EXERCISE_COLOR,
+                                                      font=("Arial", 36), width=1000,
+                                                      justify="center")
+        self._trough_item = self.canvas.create_rectangle(0, 0, 0, 0, fill=TROUGH_COLOR, outline="")
+        self._bar_item = self.canvas.create_rectangle(0, 0, 0, 0, fill=BAR_COLOR, outline="")
+        self._bar_origin = (0, 0)
+        self._shown_text = None
+        self._shown_bar = None
+        self.canvas.bind("<Configure>", self._layout)
+
+    def _layout(self, event=None):
+        width = self.canvas.winfo_width()
+        height = self.canvas.winfo_height()
+        cx = width // 2
+        timer_y = int(height * 0.3)
+        exercise_y = int(height * 0.5)
+        bar_y = int(height * 0.7)
+        wrap = max(200, min(1000, width - 80))
+        self.canvas.coords(self._timer_shadow, cx + 2, timer_y + 2)
+        self.canvas.coords(self._timer_item, cx, timer_y)
+        self.canvas.coords(self._exercise_shadow, cx + 2, exercise_y + 2)
+        self.canvas.coords(self._exercise_item, cx, exercise_y)
+        self.canvas.itemconfigure(self._exercise_shadow, width=wrap)
+        self.canvas.itemconfigure(self._exercise_item, width=wrap)
+        x0 = cx - self.bar_length // 2
+        self._bar_origin = (x0, bar_y)
+        self.canvas.coords(self._trough_item, x0, bar_y, x0 + self.bar_length, bar_y + self.bar_height)
+        # Force the bar to be re-placed at its new origin
+        shown, self._shown_bar = self._shown_bar, None
+        if shown is not None:
+            self._set_bar(shown)
+
+    def progress_steps(self, break_length):
+        """Distinct progress positions worth waking up for during a break.
+
+        One per pixel of bar, but never more than MAX_PROGRESS_FPS per second.
+        """
+        return max(1, min(self.bar_length, int(break_length * MAX_PROGRESS_FPS)))
+
+    def show(self, exercise_text, background=None):
+        """Prepare the screen for a new break."""
+        self.set_background(background)
+        self.canvas.itemconfigure(self._exercise_shadow, text=exercise_text)
+        self.canvas.itemconfigure(self._exercise_item, text=exercise_text)
+        self._shown_text = None
+        self._shown_bar = None
+        self._set_bar(0)
+        self._layout()
+
+    def set_background(self, photo):
+        """Draw ``photo`` (a Tk image) behind everything, or nothing if None."""
+        self._background = photo
+        self.canvas.itemconfigure(self._bg_item, image=photo if photo is not None else "")
+
+    def _set_bar(self, pixels):
+        x0, y0 = self._bar_origin
+        self.canvas.coords(self._bar_item, x0, y0, x0 + pixels, y0 + self.bar_height)
+        self._shown_bar = pixels
+
+    def update(self, remaining_time, progress):
+        """Redraw only the items whose visible value changed."""
+        text = format_break_remaining(remaining_time)
+        if text != self._shown_text:
+            self.canvas.itemconfigure(self._timer_shadow, text=text)
+            self.canvas.itemconfigure(self._timer_item, text=text)
+            self._shown_text = text
+        pixels = int(round(min(1.0, max(0.0, progress)) * self.bar_length))
+        if pixels != self._shown_bar:
+            self._set_bar(pixels)
+
+    def clear(self):
+        """Drop the background image so its pixels can be freed."""
+        self.set_background(None)
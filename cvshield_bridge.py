@@ -0,0 +1,203 @@
+"""Thread-safe hand-off between the Tk loop and other threads.
+
+Tkinter must only be touched from the thread running the Tk loop, yet the
+tray menu and the control socket run on their own threads. Commands from
+those threads go through ``TkCommandQueue``: producers append to a deque
+(atomic, no lock) and write one byte to a pipe the Tk loop watches, so the
+loop wakes immediately, with no polling, and runs everything queued in one
+time-boxed batch.
+
+The other direction, Tk to tray, goes through ``TrayUpdater``: the Tk side
+only records the wanted title/icon, and a tray-side thread applies the
+latest values, skipping unchanged ones and at most ``max_rate`` times a
+second.
+"""
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+import tkinter as tk
+
+
+class TkCommandQueue:
+    """Run callables posted from any thread on the Tk thread, in batches."""
+
+    # Without a pipe to watch (e.g. Windows), check this often instead
+    POLL_INTERVAL_MS = 15
+
+    def __init__(self, root, batch_seconds=0.008, history=200):
+        self.root = root
+        self.batch_seconds = batch_seconds
+        self._items = collections.deque()
+        self._signalled = False
+        self._closed = False
+        # Seconds from post() to the start of the call, newest last
+        self.latencies = collections.deque(maxlen=history)
+        self._read_fd = self._write_fd = None
+        self._wakes_on_signals = False
+        try:
+            self._read_fd, self._write_fd = os.pipe()
+            os.set_blocking(self._read_fd, False)
+            os.set_blocking(self._write_fd, False)
+            root.tk.createfilehandler(self._read_fd, tk.READABLE, self._on_readable)
+        except (AttributeError, OSError, tk.TclError):
+            self._close_pipe()
+            self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def post(self, func, *args):
+        """Queue ``func(*args)`` for the Tk thread; safe from any thread."""
+        self._items.append((func, args, time.perf_counter()))
+        if not self._signalled and self._write_fd is not None:
+            self._signalled = True
+            try:
+                os.write(self._write_fd, b"\0")
+            except (BlockingIOError, OSError):
+                # A full pipe already guarantees a wakeup
+                pass
+
+    def wake_on_signals(self):
+        """Wake the Tk loop when a signal arrives; call from the main thread.
+
+        Python signal handlers only run once the interpreter gets control,
+        and Tk can sit in its event wait for minutes. With the pipe as the
+        wakeup fd the signal wakes the loop at once, the handler runs, and
+        it can ``post()`` its work. Returns False if there is no pipe.
+        """
+        if self._write_fd is None:
+            return False
+        try:
+            signal.set_wakeup_fd(self._write_fd, warn_on_full_buffer=False)
+        except (AttributeError, ValueError, OSError):
+            return False
+        self._wakes_on_signals = True
+        return True
+
+    def _on_readable(self, fd, mask):
+        try:
+            while os.read(fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        # Clear before draining: a post() racing with the drain re-signals
+        self._signalled = False
+        self.drain()
+
+    def _poll(self):
+        if self._closed:
+            return
+        self.drain()
+        self.root.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def drain(self):
+        """Run queued commands until empty or the batch time is used up."""
+        start = time.perf_counter()
+        items = self._items
+        while items:
+            func, args, posted = items.popleft()
+            self.latencies.append(time.perf_counter() - posted)
+            try:
+                func(*args)
+            except Exception:
+                # One bad command must not stall the ones behind it
+                self.root.report_callback_exception(*sys.exc_info())
+            if time.perf_counter() - start > self.batch_seconds and items:
+                # Let Tk repaint and handle input, then carry on
+                self.root.after(1, self.drain)
+                return
+
+    def latency_stats(self):
+        """Return post-to-run latency percentiles in milliseconds."""
+        samples = sorted(self.latencies)
+        if not samples:
+            return None
+
+        def pick(q):
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+        return {"count": len(samples), "p50_ms": pick(0.5), "p99_ms": pick(0.99), "max_ms": pick(1.0)}
+
+    def _close_pipe(self):
+        if self._wakes_on_signals:
+            self._wakes_on_signals = False
+            try:
+                signal.set_wakeup_fd(-1)
+            except (ValueError, OSError):
+                pass
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._read_fd = self._write_fd = None
+
+    def close(self):
+        self._closed = True
+        if self._read_fd is not None:
+            try:
+                self.root.tk.deletefilehandler(self._read_fd)
+            except Exception:
+                pass
+        self._close_pipe()
+
+
+class TrayUpdater:
+    """Apply tray title/icon changes from a thread of its own, rate limited."""
+
+    def __init__(self, icon, max_rate=4.0, clock=time.monotonic):
+        self.icon = icon
+        self.min_interval = 1.0 / max_rate
+        self.clock = clock
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._applied = {}
+        self._last_apply = None
+        self._closed = False
+        self.applied_count = 0
+        self._thread = threading.Thread(target=self._run, name="cvshield-tray-updates", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def _same(a, b):
+        # Icons are cached frames, so identity is enough and avoids pixel compares
+        return a == b if isinstance(a, str) else a is b
+
+    def update(self, **properties):
+        """Ask for new tray properties (``title``, ``icon``); cheap, never blocks."""
+        with self._cond:
+            for name, value in properties.items():
+                if name in self._applied and self._same(self._applied[name], value):
+                    self._pending.pop(name, None)
+                else:
+                    self._pending[name] = value
+            if self._pending:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                if self._last_apply is not None:
+                    wait = self._last_apply + self.min_interval - self.clock()
+                    if wait > 0:
+                        # Later updates in the meantime replace these ones
+                        self._cond.wait(wait)
+                        continue
+                pending, self._pending = self._pending, {}
+                self._applied.update(pending)
+                self._last_apply = self.clock()
+            for name, value in pending.items():
+                try:
+                    setattr(self.icon, name, value)
+                except Exception:
+                    pass
+            self.applied_count += 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
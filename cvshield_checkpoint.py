@@ -0,0 +1,118 @@
+"""Timer-state checkpoint for CVShield.
+
+The current cycle is saved as one fixed-size binary record whenever the
+scheduler changes state, and once more on a clean exit, so a crash, logout
+or update resumes the cycle instead of starting from zero. The record is
+written to a temporary file and renamed over the old one; nothing is
+written on ticks.
+"""
+import collections
+import os
+import struct
+import time
+import zlib
+
+from cvshield_scheduler import STOPPED, WORKING, PAUSED, ON_BREAK
+
+_STATE_CODES = {STOPPED: 0, WORKING: 1, PAUSED: 2, ON_BREAK: 3}
+_CODE_STATES = {code: state for state, code in _STATE_CODES.items()}
+
+MAGIC = b"CVSC"
+VERSION = 1
+# magic, version, state, flags, wall time written, seconds into the phase,
+# break length; followed by a CRC32 of everything before it
+RECORD = struct.Struct("<4sBBBxddd")
+# Bits of the flags byte (records from before the idle bit only ever have 0 or 1)
+FLAG_CLEAN_EXIT = 0x01
+FLAG_IDLE_PAUSE = 0x02
+CRC = struct.Struct("<I")
+RECORD_SIZE = RECORD.size + CRC.size
+
+Checkpoint = collections.namedtuple("Checkpoint", "state elapsed break_length written clean_exit idle_paused")
+
+
+def default_checkpoint_path():
+    """Return the checkpoint path under the XDG state directory."""
+    base = os.environ.get("XDG_STATE_HOME") or os.path.join(os.path.expanduser("~"), ".local", "state")
+    return os.path.join(base, "cvshield", "timer.state")
+
+
+class TimerCheckpoint:
+    """Read and atomically replace the checkpoint record."""
+
+    def __init__(self, path=None, wall_clock=time.time):
+        self.path = path or default_checkpoint_path()
+        self.wall_clock = wall_clock
+        self.writes = 0
+
+    def write(self, state, elapsed, break_length=0.0, clean_exit=False, idle_paused=False):
+        """Replace the record; ``idle_paused`` marks a pause made by the idle monitor."""
+        flags = (FLAG_CLEAN_EXIT if clean_exit else 0) | (FLAG_IDLE_PAUSE if idle_paused else 0)
+        body = RECORD.pack(MAGIC, VERSION, _STATE_CODES[state], flags,
+                           self.wall_clock(), elapsed, break_length)
+        data = body + CRC.pack(zlib.crc32(body))
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self.path)
+        except FileNotFoundError:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self.path)
+        self.writes += 1
+
+    def read(self):
+        """Return the stored Checkpoint, or None if missing or damaged."""
+        try:
+            with open(self.path, "rb") as fh:
+                data = fh.read(RECORD_SIZE + 1)
+        except OSError:
+            return None
+        if len(data) != RECORD_SIZE:
+            return None
+        body, (crc,) = data[:RECORD.size], CRC.unpack(data[RECORD.size:])
+        if zlib.crc32(body) != crc:
+            return None
+        magic, version, code, flags, written, elapsed, break_length = RECORD.unpack(body)
+        if magic != MAGIC or version != VERSION or code not in _CODE_STATES:
+            return None
+        return Checkpoint(_CODE_STATES[code], elapsed, break_length, written,
+                          bool(flags & FLAG_CLEAN_EXIT), bool(flags & FLAG_IDLE_PAUSE))
+
+
+def resume_plan(checkpoint, now, break_interval, break_duration):
+    """Decide how to resume from ``checkpoint`` at wall time ``now``.
+
+    Returns (state, elapsed, break_length) for ``BreakScheduler.restore``,
+    or None if the timer was stopped. After a clean exit, time offline at
+    least as long as a break counts as one and starts a fresh cycle; a
+    shorter gap counts towards the current phase. After a crash the exit
+    time is unknown, so the whole gap counts towards the phase, and a
+    cycle that would have finished its work and its break by now starts
+    afresh.
+
+    A pause the user made stays a pause however long CVShield was gone. An
+    idle pause would never be lifted (the new idle monitor did not see the
+    absence start), so it resumes working, or starts a fresh cycle if the
+    user has been away at least a break's length since it was saved.
+    """
+    if checkpoint is None or checkpoint.state == STOPPED:
+        return None
+    gap = max(0.0, now - checkpoint.written)
+    fresh = (WORKING, 0.0, 0.0)
+    if checkpoint.state == PAUSED:
+        if not checkpoint.idle_paused:
+            return (PAUSED, checkpoint.elapsed, 0.0)
+        return fresh if gap >= break_duration else (WORKING, checkpoint.elapsed, 0.0)
+    if checkpoint.clean_exit and gap >= break_duration:
+        return fresh
+    elapsed = checkpoint.elapsed + gap
+    if checkpoint.state == ON_BREAK:
+        if elapsed >= checkpoint.break_length:
+            return fresh
+        return (ON_BREAK, elapsed, checkpoint.break_length)
+    if elapsed >= break_interval + break_duration:
+        return fresh
+    return (WORKING, elapsed, 0.0)
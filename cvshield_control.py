@@ -0,0 +1,191 @@
+"""Local control socket for a running CVShield instance.
+
+The server listens on a Unix domain socket and speaks line-delimited JSON:
+each request is one object such as ``{"cmd": "status"}`` and gets one object
+back. ``status`` is answered on the socket thread from a snapshot that the
+GUI republishes on every state change, extrapolating the countdown from the
+snapshot time, so it never waits for the Tk loop. The other commands
+(``start``, ``stop``, ``pause``, ``resume``, ``break_now``) are handed to a
+dispatcher and acknowledged immediately.
+
+Run ``python CVShield.py ctl status`` (or ``python cvshield_control.py
+status``) to talk to it from scripts and status bars.
+"""
+import argparse
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+
+COMMANDS = ("status", "start", "stop", "pause", "resume", "break_now")
+
+# States whose countdown keeps running between snapshots
+_COUNTING_STATES = ("working", "break")
+
+
+def default_socket_path():
+    """Return the per-user control socket path."""
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "cvshield", "control.sock")
+    return os.path.join("/tmp", "cvshield-%d" % os.getuid(), "control.sock")
+
+
+def make_private_dir(directory, mode=0o700):
+    """Create ``directory`` with ``mode`` or check an existing one is ours alone.
+
+    The /tmp fallback is shared, so another user could have made the
+    directory first; raises OSError unless it is a real directory owned by
+    this user with exactly ``mode``.
+    """
+    try:
+        os.makedirs(directory, mode=0o700)
+        # makedirs' mode is filtered through the umask
+        os.chmod(directory, mode)
+    except FileExistsError:
+        pass
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError("%s is not a directory" % directory)
+    if st.st_uid != os.getuid():
+        raise OSError("%s is owned by another user" % directory)
+    if stat.S_IMODE(st.st_mode) != mode:
+        raise OSError("%s must have mode %04o, not %04o" % (directory, mode, stat.S_IMODE(st.st_mode)))
+
+
+class ControlServer:
+    """Serve status and commands on a Unix domain socket."""
+
+    def __init__(self, dispatch, path=None, clock=time.monotonic, extra_status=None):
+        self.dispatch = dispatch
+        # Optional callable returning live fields that are safe to read off the Tk thread
+        self.extra_status = extra_status
+        self.path = path or default_socket_path()
+        self.clock = clock
+        self._snapshot = {"state": "stopped", "remaining": None, "at": clock()}
+        self._sock = None
+        self._thread = None
+
+    def publish(self, snapshot):
+        """Replace the status snapshot; ``snapshot["at"]`` is its clock time."""
+        # A single reference assignment, so readers never see a half update
+        self._snapshot = dict(snapshot)
+
+    def status(self):
+        snapshot = self._snapshot
+        status = dict(snapshot)
+        del status["at"]
+        remaining = snapshot.get("remaining")
+        if remaining is not None and snapshot.get("state") in _COUNTING_STATES:
+            status["remaining"] = max(0.0, remaining - (self.clock() - snapshot["at"]))
+        if self.extra_status is not None:
+            status.update(self.extra_status())
+        return status
+
+    def start(self):
+        make_private_dir(os.path.dirname(self.path))
+        self._remove_stale_socket()
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o177)
+        try:
+            sock.bind(self.path)
+        finally:
+            os.umask(old_umask)
+        sock.listen(8)
+        self._sock = sock
+        self._thread = threading.Thread(target=self._accept_loop, name="cvshield-control", daemon=True)
+        self._thread.start()
+
+    def _remove_stale_socket(self):
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            # Nobody is listening; a previous run died without cleaning up
+            os.unlink(self.path)
+        else:
+            raise OSError("another CVShield instance is listening on %s" % self.path)
+        finally:
+            probe.close()
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            finally:
+                self._sock = None
+                try:
+                    os.unlink(self.path)
+                except OSError:
+                    pass
+
+    def _accept_loop(self):
+        # Blocks in accept(); no periodic wakeups while nobody is connected
+        while self._sock is not None:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _serve(self, conn):
+        with conn, conn.makefile("rb") as reader:
+            for line in reader:
+                reply = self.handle_line(line)
+                try:
+                    conn.sendall(reply)
+                except OSError:
+                    return
+
+    def handle_line(self, line):
+        """Answer one request line; returns the encoded reply line."""
+        try:
+            request = json.loads(line)
+            command = request["cmd"]
+        except (ValueError, KeyError, TypeError):
+            return b'{"ok": false, "error": "bad request"}\n'
+        if command == "status":
+            reply = {"ok": True, "status": self.status()}
+        elif command in COMMANDS:
+            try:
+                self.dispatch(command)
+                reply = {"ok": True}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+        else:
+            reply = {"ok": False, "error": "unknown command: %s" % command}
+        return (json.dumps(reply) + "\n").encode("utf-8")
+
+
+def send_command(command, path=None, timeout=2.0):
+    """Send one command to a running instance and return its reply dict."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(path or default_socket_path())
+        sock.sendall((json.dumps({"cmd": command}) + "\n").encode("utf-8"))
+        with sock.makefile("rb") as reader:
+            return json.loads(reader.readline())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cvshield ctl", description="Control a running CVShield")
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("--socket", help="control socket path (default: %(default)s)",
+                        default=default_socket_path())
+    args = parser.parse_args(argv)
+    try:
+        reply = send_command(args.command, args.socket)
+    except OSError as e:
+        print(f"cvshield ctl: cannot reach CVShield at {args.socket}: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(reply.get("status", reply), indent=2))
+    return 0 if reply.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+"""Timer rules shared by the CVShield window and the simulator.
+
+``TimerController`` decides what the user's (and the control socket's)
+commands and idle/active reports do to the scheduler: when a command is
+ignored, when a stopped timer is started first, how an idle pause is
+backdated and how the absence is credited on return. It knows nothing about
+Tk. The host provides the parts that do:
+
+``start_timer()`` / ``stop_timer()``
+    start or stop the scheduler along with whatever the host shows for it
+``timer_changed()``
+    called after the controller changed the scheduler's state, to re-arm
+    the host's wakeup and refresh its controls
+
+Subscribers get ``callback(controller, action, details)`` for "pause" and
+"resume" (with ``source`` "user" or "idle") and "idle_break" (an absence
+that counted as a break).
+"""
+from cvshield_scheduler import WORKING, PAUSED, ON_BREAK
+
+COMMANDS = ("start", "stop", "pause", "resume", "break_now")
+
+
+class TimerController:
+    """Apply commands and idle reports to a ``BreakScheduler`` on behalf of a host."""
+
+    def __init__(self, scheduler, host):
+        self.scheduler = scheduler
+        self.host = host
+        # True while the current pause was made by the idle monitor
+        self.idle_paused = False
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Register ``callback(controller, action, details)``; returns it."""
+        self._listeners.append(callback)
+        return callback
+
+    def _notify(self, action, **details):
+        for callback in list(self._listeners):
+            callback(self, action, details)
+
+    @property
+    def is_stopped(self):
+        return self.scheduler.state not in (WORKING, PAUSED, ON_BREAK)
+
+    def toggle_pause(self):
+        """Pause or resume the timer."""
+        # A manual toggle takes over from any automatic idle pause
+        self.idle_paused = False
+        scheduler = self.scheduler
+        if scheduler.is_paused:
+            scheduler.resume()
+            self._notify("resume", source="user")
+        elif scheduler.pause():
+            self._notify("pause", source="user")
+        # Paused schedulers report no wakeup, so this cancels the pending one
+        self.host.timer_changed()
+
+    def run_command(self, command):
+        """Carry out one of COMMANDS; commands that do not apply are ignored."""
+        state = self.scheduler.state
+        if command == "start":
+            if self.is_stopped:
+                self.host.start_timer()
+        elif command == "stop":
+            if self.scheduler.is_running:
+                self.host.stop_timer()
+        elif command == "pause":
+            if state == WORKING:
+                self.toggle_pause()
+        elif command == "resume":
+            if state == PAUSED:
+                self.toggle_pause()
+        elif command == "break_now":
+            if self.is_stopped:
+                self.host.start_timer()
+            if self.scheduler.state != ON_BREAK:
+                self.idle_paused = False
+                # The host's state listener puts up the break
+                self.scheduler.start_break()
+                self.host.timer_changed()
+
+    def user_idle(self, idle_seconds):
+        """Pause the work timer as of the user's last input (``IdleMonitor.on_idle``).
+
+        During a break this returns False, so the monitor asks again and the
+        pause still happens if the user is away when the break ends.
+        """
+        scheduler = self.scheduler
+        if scheduler.state == ON_BREAK:
+            return False
+        if scheduler.state != WORKING:
+            return
+        self.idle_paused = True
+        # The scheduler keeps this from reaching back before the work period
+        # (for an absence that began during a break, to the break's end)
+        scheduler.pause(now=scheduler.clock() - idle_seconds)
+        self._notify("pause", source="idle", idle_seconds=idle_seconds)
+        self.host.timer_changed()
+
+    def user_active(self, away_seconds, since_return):
+        """Resume after an idle pause (``IdleMonitor.on_active``).
+
+        A long enough absence counts as a break for the schedules it covers.
+        """
+        scheduler = self.scheduler
+        if not self.idle_paused or scheduler.state != PAUSED:
+            self.idle_paused = False
+            return
+        # Backdate to the first input after the absence
+        returned_at = scheduler.clock() - since_return
+        if scheduler.end_absence(away_seconds, now=returned_at):
+            self._notify("idle_break", away_seconds=away_seconds)
+        # Cleared only now so state listeners can tell this resume was automatic
+        self.idle_paused = False
+        self._notify("resume", source="idle", away_seconds=away_seconds)
+        self.host.timer_changed()
@@ -0,0 +1,246 @@
+"""Exercise catalog for CVShield breaks.
+
+Exercises ship in packs: ``*.jsonl`` files with one exercise per line::
+
+    {"id": "eyes-blink", "category": "eyes", "locale": "en",
+     "min_seconds": 5, "max_seconds": 60, "weight": 1.0, "text": "Blink 20 times."}
+
+Only ``id`` and ``text`` are required. Packs are found in the bundled
+``exercises/`` directory and in ``$XDG_DATA_HOME/cvshield/exercises/``.
+
+Choosing an exercise only needs the small per-pack index (id, category,
+locale, duration fit, weight and the line's byte offset), which is cached
+under ``$XDG_CACHE_HOME/cvshield/exercise-index/`` and rebuilt when a pack
+changes. The text of the chosen exercise is read by seeking to its offset,
+so packs with thousands of entries are never parsed at startup.
+"""
+import collections
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+
+from cvshield_settings import atomic_write_json
+
+# Shown when no pack can be read at all
+DEFAULT_EXERCISE = "Look at something at least 20 feet away for 20 seconds."
+
+# Bumped when rows change meaning, so stale cached indexes are rebuilt
+INDEX_VERSION = 2
+
+IndexEntry = collections.namedtuple(
+    "IndexEntry", "id category locale min_seconds max_seconds weight pack offset length")
+
+
+def bundled_pack_dir():
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "exercises")
+
+
+def user_pack_dir():
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "cvshield", "exercises")
+
+
+def default_index_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "cvshield", "exercise-index")
+
+
+def system_language():
+    """Return the user's language code (e.g. "de" for de_DE.UTF-8), default "en"."""
+    for var in ("LC_ALL", "LC_MESSAGES", "LANG"):
+        value = os.environ.get(var)
+        if value and value not in ("C", "POSIX"):
+            return value.split(".")[0].split("_")[0].lower()
+    return "en"
+
+
+def build_index(pack_path):
+    """Scan a pack once; return [id, category, locale, min, max, weight, offset, length] rows."""
+    rows = []
+    offset = 0
+    with open(pack_path, "rb") as fh:
+        for line in fh:
+            stripped = line.strip()
+            if stripped and not stripped.startswith(b"#"):
+                try:
+                    record = json.loads(stripped)
+                    # Durations are compared with the break length, so must be numbers
+                    max_seconds = record.get("max_seconds")
+                    rows.append([str(record["id"]), record.get("category", "general"),
+                                 record.get("locale", "en"), float(record.get("min_seconds", 0)),
+                                 None if max_seconds is None else float(max_seconds),
+                                 float(record.get("weight", 1.0)), offset, len(line)])
+                except (ValueError, KeyError, TypeError):
+                    # One bad line should not take the whole pack down
+                    pass
+            offset += len(line)
+    return rows
+
+
+class WeightedDeck:
+    """Weighted random draws in O(1) using Vose's alias method."""
+
+    def __init__(self, entries, rng):
+        self.entries = entries
+        self.rng = rng
+        count = len(entries)
+        total = sum(e.weight for e in entries) or 1.0
+        scaled = [e.weight * count / total for e in entries]
+        self._prob = [1.0] * count
+        self._alias = list(range(count))
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self._prob[s] = scaled[s]
+            self._alias[s] = l
+            scaled[l] -= 1.0 - scaled[s]
+            (small if scaled[l] < 1.0 else large).append(l)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def draw(self):
+        i = int(self.rng.random() * len(self.entries))
+        return self.entries[i if self.rng.random() < self._prob[i] else self._alias[i]]
+
+
+class ExerciseCatalog:
+    """Pick exercises that fit the break, weighted and without recent repeats.
+
+    Nothing is read until the first draw. An exercise is not repeated
+    within the last ``recent`` draws (or half the candidates, if fewer);
+    draws that hit a recent one are retried, which stays O(1) on average
+    because at most half the candidates are excluded.
+    """
+
+    MAX_RETRIES = 32
+
+    def __init__(self, pack_dirs=None, locale=None, index_dir=None, recent=20, rng=None):
+        self.pack_dirs = pack_dirs if pack_dirs is not None else [bundled_pack_dir(), user_pack_dir()]
+        self.locale = locale or system_language()
+        self.index_dir = index_dir or default_index_dir()
+        self.recent = recent
+        self.rng = rng or random.Random()
+        self._entries = None
+        self._decks = {}
+        self._recent_ids = collections.deque()
+        self._recent_set = set()
+        self._lock = threading.Lock()
+
+    # -- index -----------------------------------------------------------
+
+    def _index_path(self, pack_path):
+        digest = hashlib.sha1(pack_path.encode("utf-8")).hexdigest()[:16]
+        return os.path.join(self.index_dir, digest + ".json")
+
+    def _pack_rows(self, pack_path):
+        stat = os.stat(pack_path)
+        index_path = self._index_path(pack_path)
+        try:
+            with open(index_path, "r") as fh:
+                index = json.load(fh)
+            if (index.get("version") == INDEX_VERSION and index.get("size") == stat.st_size
+                    and index.get("mtime_ns") == stat.st_mtime_ns):
+                return index["entries"]
+        except (OSError, ValueError):
+            pass
+        rows = build_index(pack_path)
+        try:
+            atomic_write_json(index_path, {"version": INDEX_VERSION, "pack": pack_path, "size": stat.st_size,
+                                           "mtime_ns": stat.st_mtime_ns, "entries": rows})
+        except OSError:
+            # Without a writable cache the index is simply rebuilt next run
+            pass
+        return rows
+
+    def _load(self):
+        by_id = {}
+        for directory in self.pack_dirs:
+            for pack_path in sorted(glob.glob(os.path.join(directory, "*.jsonl"))):
+                pack_path = os.path.abspath(pack_path)
+                try:
+                    rows = self._pack_rows(pack_path)
+                except OSError:
+                    continue
+                for row in rows:
+                    # Later packs (the user's) replace same-id entries; weight 0 removes one
+                    entry = IndexEntry(*row[:6], pack_path, *row[6:])
+                    by_id.pop(entry.id, None)
+                    if entry.weight > 0:
+                        by_id[entry.id] = entry
+        return list(by_id.values())
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def reload(self):
+        """Forget the loaded index so packs are re-read on the next draw."""
+        with self._lock:
+            self._entries = None
+            self._decks = {}
+
+    # -- selection -------------------------------------------------------
+
+    def _candidates(self, break_seconds, category=None):
+        entries = self.entries
+        if category is not None:
+            # A category with no exercises falls back to all of them
+            entries = [e for e in entries if e.category == category] or entries
+        for locale in (self.locale, "en", None):
+            pool = [e for e in entries if locale is None or e.locale == locale]
+            if pool:
+                break
+        fitting = [e for e in pool if e.min_seconds <= break_seconds
+                   and (e.max_seconds is None or break_seconds <= e.max_seconds)]
+        # Better a slightly long exercise than none at all
+        return fitting or pool
+
+    def _deck(self, break_seconds, category=None):
+        key = (break_seconds, category)
+        deck = self._decks.get(key)
+        if deck is None:
+            deck = self._decks[key] = WeightedDeck(self._candidates(break_seconds, category), self.rng)
+        return deck
+
+    def draw(self, break_seconds=0, category=None):
+        """Return the IndexEntry for the next exercise, or None if there are none."""
+        with self._lock:
+            deck = self._deck(break_seconds, category)
+            if not len(deck):
+                return None
+            window = min(self.recent, len(deck) // 2)
+            for _ in range(self.MAX_RETRIES):
+                entry = deck.draw()
+                if entry.id not in self._recent_set:
+                    break
+            self._recent_ids.append(entry.id)
+            self._recent_set.add(entry.id)
+            while len(self._recent_ids) > window:
+                self._recent_set.discard(self._recent_ids.popleft())
+            return entry
+
+    def read(self, entry):
+        """Return the full record for ``entry``, read from its pack."""
+        with open(entry.pack, "rb") as fh:
+            fh.seek(entry.offset)
+            return json.loads(fh.read(entry.length))
+
+    def choose(self, break_seconds=0, category=None):
+        """Return the text of the next exercise for a break of ``break_seconds``.
+
+        ``category`` limits the choice to that category, if it has any.
+        """
+        try:
+            entry = self.draw(break_seconds, category)
+            if entry is not None:
+                return self.read(entry)["text"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return DEFAULT_EXERCISE
@@ -0,0 +1,267 @@
+"""Append-only break history for CVShield.
+
+Every break taken or skipped and every pause is appended as a fixed-size
+binary record to the current log segment; segments rotate once they reach
+``segment_bytes``. Daily and weekly totals are kept up to date as events are
+written, so statistics and exports over years of history read only the small
+rollup file, never the raw log.
+
+``record`` only puts a tuple on a queue. A writer thread appends the records,
+updates the rollups and periodically saves them. The rollup file remembers
+how far into the log it has counted, so after a crash only the tail of the
+log is replayed.
+"""
+import datetime
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+from cvshield_settings import atomic_write_json
+
+# Event types stored in the log
+EVENT_BREAK = 1      # break taken; actual is how long it lasted
+EVENT_SKIPPED = 2    # break abandoned before its end
+EVENT_PAUSE = 3      # work timer paused; actual is how long it stayed paused
+EVENT_IDLE = 4       # user away long enough to count as a break
+
+EVENT_NAMES = {
+    EVENT_BREAK: "break",
+    EVENT_SKIPPED: "skipped",
+    EVENT_PAUSE: "pause",
+    EVENT_IDLE: "idle",
+}
+
+# timestamp (epoch seconds), event type, planned seconds, actual seconds
+RECORD = struct.Struct("<dBff")
+
+ROLLUP_VERSION = 1
+
+
+def default_history_dir():
+    """Return the per-user directory for the history log."""
+    base = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
+    return os.path.join(base, "cvshield", "history")
+
+
+def _empty_totals():
+    return {"breaks": 0, "skipped": 0, "pauses": 0, "idle": 0,
+            "break_seconds": 0.0, "planned_seconds": 0.0, "pause_seconds": 0.0}
+
+
+def _apply(totals, event_type, planned, actual):
+    if event_type == EVENT_BREAK:
+        totals["breaks"] += 1
+        totals["break_seconds"] += actual
+        totals["planned_seconds"] += planned
+    elif event_type == EVENT_SKIPPED:
+        totals["skipped"] += 1
+        totals["break_seconds"] += actual
+        totals["planned_seconds"] += planned
+    elif event_type == EVENT_PAUSE:
+        totals["pauses"] += 1
+        totals["pause_seconds"] += actual
+    elif event_type == EVENT_IDLE:
+        totals["idle"] += 1
+        totals["break_seconds"] += actual
+
+
+class BreakHistory:
+    """Segmented event log plus incrementally maintained rollups."""
+
+    def __init__(self, directory=None, segment_bytes=1024 * 1024, max_segments=None,
+                 save_interval=5.0):
+        self.directory = directory or default_history_dir()
+        self.segment_bytes = segment_bytes - segment_bytes % RECORD.size
+        self.max_segments = max_segments
+        self.save_interval = save_interval
+        self._queue = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._rollups = None
+        self._last_save = 0.0
+        self._dirty = False
+
+    # -- public API ------------------------------------------------------
+
+    def record(self, event_type, planned=0.0, actual=0.0, timestamp=None):
+        """Queue an event; safe and cheap to call from the GUI thread."""
+        self._queue.put((time.time() if timestamp is None else timestamp,
+                         event_type, float(planned), float(actual)))
+        if self._thread is None:
+            self._start()
+
+    def close(self, timeout=2.0):
+        """Write everything queued so far and stop the writer thread."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+
+    def daily(self):
+        """Return {"YYYY-MM-DD": totals} from the rollups."""
+        with self._lock:
+            self._ensure_loaded()
+            return {day: dict(t) for day, t in self._rollups["daily"].items()}
+
+    def weekly(self):
+        """Return {"YYYY-Www": totals} (ISO weeks) from the rollups."""
+        with self._lock:
+            self._ensure_loaded()
+            return {week: dict(t) for week, t in self._rollups["weekly"].items()}
+
+    def iter_events(self):
+        """Yield (timestamp, event_type, planned, actual) from the raw log."""
+        for index in self._segment_indexes():
+            with open(self._segment_path(index), "rb") as fh:
+                data = fh.read()
+            usable = len(data) - len(data) % RECORD.size
+            yield from RECORD.iter_unpack(data[:usable])
+
+    # -- storage ---------------------------------------------------------
+
+    @property
+    def _rollup_path(self):
+        return os.path.join(self.directory, "rollups.json")
+
+    def _segment_path(self, index):
+        return os.path.join(self.directory, "segment-%06d.bin" % index)
+
+    def _segment_indexes(self):
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        indexes = []
+        for name in names:
+            if name.startswith("segment-") and name.endswith(".bin"):
+                try:
+                    indexes.append(int(name[8:-4]))
+                except ValueError:
+                    pass
+        return sorted(indexes)
+
+    def _ensure_loaded(self):
+        """Load the rollups and fold in any log tail they have not seen."""
+        if self._rollups is not None:
+            return
+        try:
+            with open(self._rollup_path, "r") as fh:
+                rollups = json.load(fh)
+            if rollups.get("version") != ROLLUP_VERSION:
+                raise ValueError("unknown rollup version")
+        except (OSError, ValueError):
+            rollups = {"version": ROLLUP_VERSION, "daily": {}, "weekly": {}, "position": [0, 0]}
+        self._rollups = rollups
+        segment, offset = rollups["position"]
+        for index in self._segment_indexes():
+            if index < segment:
+                continue
+            start = offset if index == segment else 0
+            with open(self._segment_path(index), "rb") as fh:
+                fh.seek(start)
+                data = fh.read()
+            usable = len(data) - len(data) % RECORD.size
+            if usable != len(data):
+                # Drop a record torn by a crash so later appends stay aligned
+                try:
+                    os.truncate(self._segment_path(index), start + usable)
+                except OSError:
+                    pass
+            for event in RECORD.iter_unpack(data[:usable]):
+                self._fold(*event)
+            rollups["position"] = [index, start + usable]
+            self._dirty = self._dirty or usable > 0
+
+    def _fold(self, timestamp, event_type, planned, actual):
+        moment = datetime.datetime.fromtimestamp(timestamp)
+        day = moment.strftime("%Y-%m-%d")
+        year, week, _ = moment.isocalendar()
+        week_key = "%04d-W%02d" % (year, week)
+        for table, key in ((self._rollups["daily"], day), (self._rollups["weekly"], week_key)):
+            totals = table.get(key)
+            if totals is None:
+                totals = table[key] = _empty_totals()
+            _apply(totals, event_type, planned, actual)
+
+    def _save_rollups(self):
+        atomic_write_json(self._rollup_path, self._rollups)
+        self._last_save = time.monotonic()
+        self._dirty = False
+
+    def _current_segment(self):
+        segment, offset = self._rollups["position"]
+        if offset + RECORD.size > self.segment_bytes:
+            segment, offset = segment + 1, 0
+            self._rollups["position"] = [segment, offset]
+            self._prune_segments(segment)
+        return segment
+
+    def _prune_segments(self, current):
+        if not self.max_segments:
+            return
+        for index in self._segment_indexes():
+            if index <= current - self.max_segments:
+                try:
+                    os.remove(self._segment_path(index))
+                except OSError:
+                    pass
+
+    def _append(self, events):
+        """Append events to the log, rotating segments as they fill."""
+        with self._lock:
+            while events:
+                segment = self._current_segment()
+                offset = self._rollups["position"][1]
+                room = (self.segment_bytes - offset) // RECORD.size
+                chunk, events = events[:room], events[room:]
+                payload = b"".join(RECORD.pack(*event) for event in chunk)
+                with open(self._segment_path(segment), "ab") as fh:
+                    fh.write(payload)
+                for event in chunk:
+                    self._fold(*event)
+                self._rollups["position"] = [segment, offset + len(payload)]
+                self._dirty = True
+
+    # -- writer thread ---------------------------------------------------
+
+    def _start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="cvshield-history", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self._ensure_loaded()
+        stopping = False
+        while not stopping:
+            timeout = self.save_interval if self._dirty else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            batch = []
+            # Drain whatever else is queued so one write covers the burst
+            while True:
+                if item is None:
+                    stopping = True
+                elif item:
+                    batch.append(item)
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+            try:
+                if batch:
+                    self._append(batch)
+                if self._dirty and (stopping or time.monotonic() - self._last_save >= self.save_interval):
+                    with self._lock:
+                        self._save_rollups()
+            except OSError:
+                # History is best effort; never take the app down over it
+                pass
@@ -0,0 +1,262 @@
+"""Break-event hooks for CVShield.
+
+Hooks run side effects when a break starts or ends and when the timer is
+paused or resumed: pausing media, setting chat presence, posting to a local
+audit endpoint. They are listed under ``"hooks"`` in the settings file::
+
+    "hooks": [
+        {"events": ["break_start"], "command": "playerctl pause", "timeout": 3},
+        {"events": ["pause", "resume"], "url": "http://127.0.0.1:8080/audit"},
+        {"python": "mypackage.presence:on_break"}
+    ]
+
+A hook without ``events`` gets all of them. Python packages can also
+register a callable under the ``cvshield.hooks`` entry-point group; it is
+called for every event. Shell commands get the event as JSON on stdin and
+as ``CVSHIELD_EVENT``; URLs get it as a JSON POST and must be on the local
+machine; Python callables are called as ``func(event, payload)``.
+
+``fire`` never blocks: events are queued to a small pool of worker threads,
+each hook run is cut off after its timeout, and once the queue is full new
+events are dropped and counted rather than held up.
+"""
+import collections
+import json
+import os
+import queue
+import signal
+import socket
+import subprocess
+import threading
+import urllib.parse
+
+EVENTS = ("break_start", "break_end", "pause", "resume")
+
+ENTRY_POINT_GROUP = "cvshield.hooks"
+DEFAULT_TIMEOUT = 5.0
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1")
+# What a hook run that hit its timeout raises
+_TIMEOUTS = (subprocess.TimeoutExpired, socket.timeout)
+
+
+def _load_callable(spec):
+    """Import "module:attribute" and return the attribute."""
+    import importlib
+    module_name, _, attr = spec.partition(":")
+    target = importlib.import_module(module_name)
+    for part in attr.split(".") if attr else ():
+        target = getattr(target, part)
+    if not callable(target):
+        raise ValueError("%s is not callable" % spec)
+    return target
+
+
+class Hook:
+    """One configured side effect and its counters."""
+
+    def __init__(self, name, kind, target, events=None, timeout=DEFAULT_TIMEOUT):
+        self.name = name
+        self.kind = kind
+        self.target = target
+        self.events = frozenset(events or EVENTS)
+        self.timeout = timeout
+        self.runs = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.dropped = 0
+        # A Python hook that overran its timeout may still be running
+        self._straggler = None
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a Hook from a settings entry; raises ValueError if it is invalid."""
+        if not isinstance(config, dict):
+            raise ValueError("hook must be an object")
+        events = config.get("events")
+        if isinstance(events, str):
+            events = [events]
+        unknown = set(events or ()) - set(EVENTS)
+        if unknown:
+            raise ValueError("unknown hook events: %s" % ", ".join(sorted(unknown)))
+        timeout = float(config.get("timeout", DEFAULT_TIMEOUT))
+        if "command" in config:
+            kind, target = "command", str(config["command"])
+        elif "url" in config:
+            kind, target = "http", str(config["url"])
+            parsed = urllib.parse.urlsplit(target)
+            if parsed.scheme not in ("http", "https") or parsed.hostname not in LOCAL_HOSTS:
+                raise ValueError("hook URLs must be http(s) on localhost: %s" % target)
+        elif "python" in config:
+            kind, target = "python", _load_callable(str(config["python"]))
+        else:
+            raise ValueError("hook needs one of command, url or python")
+        name = config.get("name") or str(config.get("command") or config.get("url") or config.get("python"))
+        return cls(name, kind, target, events, timeout)
+
+    def stats(self):
+        return {"name": self.name, "type": self.kind, "runs": self.runs, "failures": self.failures,
+                "timeouts": self.timeouts, "dropped": self.dropped}
+
+    def run(self, event, payload):
+        """Run once for ``event``; returns normally only if the hook succeeded."""
+        if self.kind == "command":
+            env = dict(os.environ, CVSHIELD_EVENT=event)
+            posix = os.name == "posix"
+            # In a session of its own, so a timeout takes down the whole pipeline
+            with subprocess.Popen(self.target, shell=True, env=env, stdin=subprocess.PIPE,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                  start_new_session=posix) as proc:
+                try:
+                    proc.communicate(json.dumps(payload).encode("utf-8"), timeout=self.timeout)
+                except subprocess.TimeoutExpired:
+                    try:
+                        if posix:
+                            os.killpg(proc.pid, signal.SIGKILL)
+                        else:
+                            proc.kill()
+                    except OSError:
+                        pass
+                    raise
+            if proc.returncode:
+                raise subprocess.CalledProcessError(proc.returncode, self.target)
+        elif self.kind == "http":
+            import urllib.error
+            import urllib.request
+            request = urllib.request.Request(self.target, data=json.dumps(payload).encode("utf-8"),
+                                             headers={"Content-Type": "application/json"}, method="POST")
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    response.read()
+            except urllib.error.URLError as e:
+                if isinstance(e.reason, socket.timeout):
+                    raise e.reason
+                raise
+        else:
+            self._run_python(event, payload)
+
+    def _run_python(self, event, payload):
+        # A thread cannot be killed, so an overrunning call is left behind
+        # and this hook is skipped until it returns, one straggler at most
+        outcome = []
+
+        def call():
+            try:
+                self.target(event, payload)
+                outcome.append(None)
+            except Exception as e:
+                outcome.append(e)
+
+        thread = threading.Thread(target=call, name="cvshield-hook", daemon=True)
+        thread.start()
+        thread.join(self.timeout)
+        if thread.is_alive():
+            self._straggler = thread
+            raise socket.timeout("%s timed out" % self.name)
+        if outcome and outcome[0] is not None:
+            raise outcome[0]
+
+    @property
+    def busy(self):
+        if self._straggler is not None and not self._straggler.is_alive():
+            self._straggler = None
+        return self._straggler is not None
+
+
+def entry_point_hooks(timeout=DEFAULT_TIMEOUT):
+    """Return a Hook for each callable installed under ``cvshield.hooks``."""
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points()
+        found = found.select(group=ENTRY_POINT_GROUP) if hasattr(found, "select") else found.get(ENTRY_POINT_GROUP, ())
+    except Exception:
+        return []
+    hooks = []
+    for entry_point in found:
+        try:
+            hooks.append(Hook("entry point " + entry_point.name, "python", entry_point.load(), timeout=timeout))
+        except Exception:
+            # A broken plugin must not keep CVShield from starting
+            pass
+    return hooks
+
+
+class HookRunner:
+    """Run hooks for timer events on a bounded pool of worker threads."""
+
+    def __init__(self, hooks=(), workers=2, queue_limit=64):
+        self.hooks = list(hooks)
+        # From installed packages; found once, kept across configure()
+        self.plugin_hooks = []
+        self.workers = workers
+        self._queue = queue.Queue(maxsize=queue_limit)
+        self._threads = []
+        self._lock = threading.Lock()
+        self.fired = 0
+        # Events dropped because the queue was full, by event name
+        self.dropped = collections.Counter()
+
+    def configure(self, hooks):
+        """Replace the settings hooks; runs already queued use the old ones."""
+        self.hooks = list(hooks)
+
+    def load_entry_points(self, timeout=DEFAULT_TIMEOUT):
+        """Find plugin hooks on a thread of their own; they take part once found.
+
+        Scanning every installed distribution's metadata is slow, so it is
+        done once and never on the caller's thread.
+        """
+        def scan():
+            self.plugin_hooks = entry_point_hooks(timeout)
+        threading.Thread(target=scan, name="cvshield-hook-plugins", daemon=True).start()
+
+    def _start_workers(self):
+        with self._lock:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work, name="cvshield-hooks", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def fire(self, event, payload=None):
+        """Queue ``event`` for every hook that wants it; never blocks."""
+        wanted = [hook for hook in self.plugin_hooks + self.hooks if event in hook.events]
+        if not wanted:
+            return
+        if not self._threads:
+            self._start_workers()
+        payload = dict(payload or {}, event=event)
+        self.fired += 1
+        for hook in wanted:
+            try:
+                self._queue.put_nowait((hook, event, payload))
+            except queue.Full:
+                self.dropped[event] += 1
+                hook.dropped += 1
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            hook, event, payload = item
+            if hook.busy:
+                hook.dropped += 1
+                continue
+            try:
+                hook.run(event, payload)
+                hook.runs += 1
+            except _TIMEOUTS:
+                hook.timeouts += 1
+            except Exception:
+                hook.failures += 1
+
+    def stats(self):
+        return {"fired": self.fired, "queued": self._queue.qsize(), "dropped": dict(self.dropped),
+                "hooks": [hook.stats() for hook in self.plugin_hooks + self.hooks]}
+
+    def close(self):
+        for _ in self._threads:
+            try:
+                self._queue.put_nowait(None)
+            except queue.Full:
+                # Workers are daemon threads and go down with the process
+                break
@@ -0,0 +1,188 @@
+"""User idle detection for CVShield.
+
+An activity source reports how long the user has been idle. ``IdleMonitor``
+turns those readings into "went idle" / "came back" callbacks and tells the
+host when to look again. While the user is active the next check is due no
+earlier than the idle threshold minus the idle time just measured (idle time
+cannot grow faster than the clock), so a busy user costs one cheap query per
+threshold period and checks only get tight as the threshold approaches.
+"""
+import ctypes
+import ctypes.util
+import os
+import time
+
+
+class FakeActivitySource:
+    """Activity source driven by hand, for tests and simulations."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.last_input = clock()
+
+    def touch(self, when=None):
+        """Pretend the user pressed a key at ``when`` (default: now)."""
+        self.last_input = self.clock() if when is None else when
+
+    def idle_seconds(self):
+        return max(0.0, self.clock() - self.last_input)
+
+
+class _XScreenSaverInfo(ctypes.Structure):
+    _fields_ = [
+        ("window", ctypes.c_ulong),
+        ("state", ctypes.c_int),
+        ("kind", ctypes.c_int),
+        ("til_or_since", ctypes.c_ulong),
+        ("idle", ctypes.c_ulong),
+        ("eventMask", ctypes.c_ulong),
+    ]
+
+
+class X11IdleSource:
+    """Idle time from the X11 MIT-SCREEN-SAVER extension (libXss)."""
+
+    def __init__(self, display=None):
+        xlib_name = ctypes.util.find_library("X11")
+        xss_name = ctypes.util.find_library("Xss")
+        if not xlib_name or not xss_name:
+            raise OSError("libX11/libXss not available")
+        self._xlib = ctypes.CDLL(xlib_name)
+        self._xss = ctypes.CDLL(xss_name)
+        self._xlib.XOpenDisplay.restype = ctypes.c_void_p
+        self._xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        self._xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        self._xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        self._xss.XScreenSaverAllocInfo.restype = ctypes.POINTER(_XScreenSaverInfo)
+        self._xss.XScreenSaverQueryInfo.argtypes = [ctypes.c_void_p, ctypes.c_ulong,
+                                                    ctypes.POINTER(_XScreenSaverInfo)]
+        self._display = self._xlib.XOpenDisplay(display.encode() if display else None)
+        if not self._display:
+            raise OSError("cannot open X display")
+        self._root = self._xlib.XDefaultRootWindow(self._display)
+        self._info = self._xss.XScreenSaverAllocInfo()
+        if not self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info):
+            raise OSError("MIT-SCREEN-SAVER extension not available")
+
+    def idle_seconds(self):
+        self._xss.XScreenSaverQueryInfo(self._display, self._root, self._info)
+        return self._info.contents.idle / 1000.0
+
+
+class ProcInterruptsSource:
+    """Idle time inferred from input-device interrupt counters in /proc.
+
+    The counters only say *whether* input happened between two reads, so a
+    change is treated as activity at the moment it was observed.
+    """
+
+    DEFAULT_PATTERNS = ("i8042", "keyboard", "mouse", "hid")
+
+    def __init__(self, path="/proc/interrupts", patterns=DEFAULT_PATTERNS, clock=time.monotonic):
+        self.path = path
+        self.patterns = tuple(p.lower() for p in patterns)
+        self.clock = clock
+        self._lines = None
+        self._last_total = self._read_total()
+        if self._last_total is None:
+            raise OSError("no input device interrupts found in %s" % path)
+        self._last_change = clock()
+
+    def _read_total(self):
+        with open(self.path, "r") as fh:
+            lines = fh.readlines()
+        if self._lines is None:
+            # Remember which rows are input devices once; the layout is stable
+            self._lines = [i for i, line in enumerate(lines)
+                           if any(p in line.lower() for p in self.patterns)]
+        if not self._lines:
+            return None
+        total = 0
+        for index in self._lines:
+            if index >= len(lines):
+                continue
+            for field in lines[index].split()[1:]:
+                if not field.isdigit():
+                    break
+                total += int(field)
+        return total
+
+    def idle_seconds(self):
+        now = self.clock()
+        total = self._read_total()
+        if total != self._last_total:
+            self._last_total = total
+            self._last_change = now
+        return now - self._last_change
+
+
+def default_activity_source():
+    """Return the best activity source available here, or None."""
+    if os.environ.get("DISPLAY"):
+        try:
+            return X11IdleSource()
+        except OSError:
+            pass
+    try:
+        return ProcInterruptsSource()
+    except OSError:
+        return None
+
+
+class IdleMonitor:
+    """Report transitions between active and idle with adaptive polling.
+
+    ``on_idle(idle_seconds)`` fires once the user has been idle for
+    ``threshold`` seconds; ``on_active(away_seconds, since_return)`` fires
+    when input is seen again, with how long the user was gone and how long
+    ago they came back. An ``on_idle`` that returns False cannot act on it
+    yet, and is called again on later polls for as long as the user stays
+    away. While away, checks back off from ``min_interval`` to
+    ``max_away_interval``; hosts can use ``since_return`` to backdate
+    whatever they do about the return.
+    """
+
+    def __init__(self, source, threshold, on_idle=None, on_active=None,
+                 min_interval=1.0, max_away_interval=15.0, clock=time.monotonic):
+        self.source = source
+        self.threshold = threshold
+        self.on_idle = on_idle
+        self.on_active = on_active
+        self.min_interval = min_interval
+        self.max_away_interval = max_away_interval
+        self.clock = clock
+        self.is_idle = False
+        self._idle_since = None
+        self._away_interval = min_interval
+        self.polls = 0
+
+    def poll(self):
+        """Read the source once; return seconds until the next poll."""
+        self.polls += 1
+        try:
+            idle = self.source.idle_seconds()
+        except Exception:
+            return max(self.threshold, self.min_interval)
+        now = self.clock()
+        if self.is_idle:
+            if idle < now - self._idle_since:
+                # Fresh input since the user went away
+                away = (now - idle) - self._idle_since
+                self.is_idle = False
+                self._idle_since = None
+                if self.on_active:
+                    self.on_active(away, idle)
+                return max(self.threshold - idle, self.min_interval)
+            self._away_interval = min(self._away_interval * 2, self.max_away_interval)
+            return self._away_interval
+        if idle >= self.threshold:
+            if self.on_idle and self.on_idle(idle) is False:
+                # Declined for now; ask again, backing off as while away
+                self._away_interval = min(self._away_interval * 2, self.max_away_interval)
+                return self._away_interval
+            self.is_idle = True
+            self._idle_since = now - idle
+            self._away_interval = self.min_interval
+            return self._away_interval
+        # Idle time cannot reach the threshold sooner than this
+        return max(self.threshold - idle, self.min_interval)
@@ -0,0 +1,376 @@
+"""Break background rendering helpers for CVShield.
+
+Scaling the scenery to full-screen size is the slowest part of entering a
+break, so scaled frames are kept both in memory and on disk, each within a
+byte budget. On-disk frames
+are PAM files of RGBX pixels (RGB padded to four bytes, a layout PIL can
+wrap without copying), memory-mapped straight into a PIL image, so a cache
+hit costs no decode, no resize and no private copy of the pixels.
+"""
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageFilter
+
+
+def default_cache_dir():
+    """Return the per-user cache directory for rendered backgrounds."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "cvshield", "backgrounds")
+
+
+# Longest header _store_on_disk writes, with room to spare
+_PAM_HEADER_LIMIT = 256
+
+
+def _read_pam_header(buf):
+    """Parse the header of an RGBX PAM (P7) frame; return (width, height, data_offset)."""
+    end = buf.find(b"ENDHDR\n", 0, _PAM_HEADER_LIMIT)
+    if end < 0:
+        # A truncated file ends inside the header
+        raise ValueError("truncated PAM header")
+    lines = bytes(buf[:end]).split(b"\n")
+    if lines[0] != b"P7":
+        raise ValueError("not a PAM file")
+    fields = dict(line.split(None, 1) for line in lines[1:] if line and not line.startswith(b"#"))
+    if fields.get(b"DEPTH") != b"4" or fields.get(b"MAXVAL") != b"255":
+        raise ValueError("not an 8-bit four-channel PAM")
+    return int(fields[b"WIDTH"]), int(fields[b"HEIGHT"]), end + len(b"ENDHDR\n")
+
+
+def image_nbytes(image):
+    """Approximate pixel memory held by a PIL image."""
+    width, height = image.size
+    return width * height * len(image.getbands())
+
+
+# Tk keeps every photo image as 32-bit pixels, whatever the source format
+PHOTO_BYTES_PER_PIXEL = 4
+
+
+def reduced_size(size, factor):
+    """Return ``size`` divided by ``factor``, rounded up so a zoom covers it."""
+    return (-(-size[0] // factor), -(-size[1] // factor))
+
+
+def budget_scale_factor(size, byte_budget):
+    """Return how far a ``size`` background must be reduced to fit ``byte_budget``.
+
+    A display-sized Tk photo is needed whatever happens; on top of it comes
+    the RGB source frame, or, when reduced, a small RGB frame and the small
+    photo that gets zoomed up. Returns 1 for full size, an integer factor for
+    a downscaled-then-upscaled frame, or None when even the display photo
+    alone does not fit. A budget of 0 means no limit.
+    """
+    if not byte_budget:
+        return 1
+    width, height = size
+    display = width * height * PHOTO_BYTES_PER_PIXEL
+    if display + width * height * 3 <= byte_budget:
+        return 1
+    small_pixel = 3 + PHOTO_BYTES_PER_PIXEL
+    if display + small_pixel > byte_budget:
+        return None
+    factor = 2
+    while True:
+        small_w, small_h = reduced_size(size, factor)
+        if display + small_w * small_h * small_pixel <= byte_budget:
+            return factor
+        factor += 1
+
+
+def load_scaled(source_path, size, resample=Image.LANCZOS):
+    """Decode ``source_path`` already reduced towards ``size`` and scale it.
+
+    JPEG draft mode lets libjpeg decode at 1/2, 1/4 or 1/8 scale, so a large
+    photo is never fully decoded just to be shrunk afterwards.
+    """
+    with Image.open(source_path) as src:
+        src.draft("RGB", tuple(size))
+        # Backgrounds are opaque, so RGB is enough and a quarter smaller than RGBA
+        img = src.convert("RGB")
+    if img.size != tuple(size):
+        img = img.resize(tuple(size), resample)
+    return img
+
+
+# Blurred-desktop backgrounds: blur radius and brightness at full resolution
+DESKTOP_BLUR_RADIUS = 24
+DESKTOP_DIM = 0.55
+# The blur runs on a frame whose short side is about this many pixels
+DESKTOP_BLUR_SHORT_SIDE = 270
+
+
+def _dim(image, dim):
+    if dim >= 1:
+        return image
+    table = [int(v * dim) for v in range(256)]
+    return image.point(table * len(image.getbands()))
+
+
+def blur_fast(image, size, radius=DESKTOP_BLUR_RADIUS, dim=DESKTOP_DIM,
+              short_side=DESKTOP_BLUR_SHORT_SIDE):
+    """Blur and dim ``image`` into a ``size`` frame the cheap way.
+
+    The image is reduced by an integer factor (a box filter, which is also a
+    first blur pass), blurred with a proportionally smaller radius and dimmed
+    at that size, and then scaled up once. A blurred frame has no detail for
+    the upscale to lose, so at large factors the smooth resize only goes to
+    a fraction of ``size`` and the rest is plain pixel repetition, which
+    costs a quarter as much at 4K.
+    """
+    factor = max(1, min(image.size) // short_side)
+    small = image.reduce(factor) if factor > 1 else image
+    if small.mode != "RGB":
+        small = small.convert("RGB")
+    small = small.filter(ImageFilter.GaussianBlur(radius / factor))
+    small = _dim(small, dim)
+    step = max(1, factor // 4)
+    if step == 1:
+        return small.resize(tuple(size), Image.BILINEAR)
+    smooth = small.resize(reduced_size(size, step), Image.BILINEAR)
+    return smooth.resize(tuple(size), Image.NEAREST)
+
+
+def blur_naive(image, size, radius=DESKTOP_BLUR_RADIUS, dim=DESKTOP_DIM):
+    """Full-resolution Gaussian blur; the reference ``blur_fast`` is measured against."""
+    blurred = _dim(image.convert("RGB").filter(ImageFilter.GaussianBlur(radius)), dim)
+    if blurred.size != tuple(size):
+        blurred = blurred.resize(tuple(size), Image.BILINEAR)
+    return blurred
+
+
+def blurred_desktop(regions, grab=None):
+    """Capture the desktop once and return {key: blurred frame}.
+
+    ``regions`` maps a key to (bbox, size): the part of the screen to use
+    (None for all of it) and the size of the frame to produce.
+    """
+    if grab is None:
+        from PIL import ImageGrab
+        grab = ImageGrab.grab
+    screen = grab()
+    frames = {}
+    for key, (bbox, size) in regions.items():
+        frames[key] = blur_fast(screen.crop(bbox) if bbox else screen, size)
+    return frames
+
+
+class LRUImageCache:
+    """Least-recently-used image cache bounded by total pixel bytes."""
+
+    def __init__(self, byte_budget):
+        self.byte_budget = byte_budget
+        self.bytes_used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, image):
+        nbytes = image_nbytes(image)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old[1]
+            if nbytes > self.byte_budget:
+                # Never worth evicting everything for a frame that cannot fit
+                return
+            self._entries[key] = (image, nbytes)
+            self.bytes_used += nbytes
+            self._evict()
+
+    def _evict(self):
+        while self.bytes_used > self.byte_budget and self._entries:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes_used -= evicted
+
+    def set_budget(self, byte_budget):
+        with self._lock:
+            self.byte_budget = byte_budget
+            self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RenderCache:
+    """Two-level cache of backgrounds pre-scaled to a given resolution.
+
+    Entries are keyed by (source path, source mtime, width, height, resample
+    mode), so replacing the source image or changing resolution naturally
+    misses. ``memory_budget`` and ``disk_budget`` are byte limits; the least
+    recently used frames are dropped first.
+    """
+
+    def __init__(self, cache_dir=None, memory_budget=128 * 1024 * 1024,
+                 disk_budget=1024 * 1024 * 1024, resample=Image.LANCZOS):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.disk_budget = disk_budget
+        self.resample = resample
+        self._memory = LRUImageCache(memory_budget)
+
+    def key_for(self, source_path, size, resample=None):
+        resample = self.resample if resample is None else resample
+        source_path = os.path.abspath(source_path)
+        mtime = os.stat(source_path).st_mtime_ns
+        return (source_path, mtime, int(size[0]), int(size[1]), int(resample))
+
+    @staticmethod
+    def _source_prefix(key):
+        return hashlib.sha1(key[0].encode("utf-8")).hexdigest()[:16]
+
+    def _disk_path(self, key):
+        name = f"{self._source_prefix(key)}-{key[1]}-{key[2]}x{key[3]}-r{key[4]}.pam"
+        return os.path.join(self.cache_dir, name)
+
+    def _prune_stale(self, key):
+        """Delete frames rendered from an older version of the same source."""
+        prefix = self._source_prefix(key) + "-"
+        current = f"{prefix}{key[1]}-"
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if name.startswith(prefix) and not name.startswith(current):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def get(self, source_path, size, resample=None):
+        """Return an image of ``source_path`` scaled to ``size``.
+
+        Frames served from the disk cache are RGBX views of the mapped
+        file; a frame that cannot be cached on disk comes back as RGB.
+        """
+        key = self.key_for(source_path, size, resample)
+        image = self._memory.get(key)
+        if image is not None:
+            return image
+
+        image = self._load_from_disk(key)
+        if image is None:
+            image = load_scaled(source_path, (key[2], key[3]), key[4])
+            # Hand out the mapped copy, so the rendered one can be freed now
+            if self._store_on_disk(key, image):
+                image = self._load_from_disk(key) or image
+        self._memory.put(key, image)
+        return image
+
+    def get_many(self, source_path, sizes, resample=None, max_workers=4):
+        """Return {size: image} for several target sizes.
+
+        Each distinct size is rendered once; misses are scaled in parallel
+        (PIL releases the GIL while resizing).
+        """
+        distinct = list(dict.fromkeys(tuple(size) for size in sizes))
+        if len(distinct) <= 1:
+            return {size: self.get(source_path, size, resample) for size in distinct}
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(distinct))) as pool:
+            images = pool.map(lambda size: self.get(source_path, size, resample), distinct)
+            return dict(zip(distinct, images))
+
+    def _load_from_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            # Refresh the mtime so disk eviction approximates LRU
+            os.utime(path)
+            fh = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            with fh:
+                mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cannot be mapped
+            self._discard(path)
+            return None
+        except OSError:
+            return None
+        try:
+            width, height, offset = _read_pam_header(mapped)
+            if (width, height) != (key[2], key[3]) or len(mapped) < offset + width * height * 4:
+                raise ValueError("truncated or mismatched cache entry")
+            # RGBX is one of PIL's mappable modes, so the image reads the
+            # mapping itself (it is read-only) rather than a copy of it
+            return Image.frombuffer("RGBX", (width, height), memoryview(mapped)[offset:],
+                                    "raw", "RGBX", 0, 1)
+        except (ValueError, IndexError, KeyError):
+            mapped.close()
+            self._discard(path)
+            return None
+
+    @staticmethod
+    def _discard(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _store_on_disk(self, key, image):
+        """Write ``image`` to the disk cache; returns whether it was written."""
+        path = self._disk_path(key)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    fh.write(b"P7\nWIDTH %d\nHEIGHT %d\nDEPTH 4\nMAXVAL 255\nTUPLTYPE RGB_ALPHA\nENDHDR\n"
+                             % image.size)
+                    fh.write(image.convert("RGBX").tobytes())
+                os.replace(tmp_path, path)
+                self._prune_stale(key)
+                self._enforce_disk_budget()
+            except Exception:
+                self._discard(tmp_path)
+                raise
+        except OSError:
+            # A read-only or full cache directory only costs us the speed-up
+            return False
+        return True
+
+    def _enforce_disk_budget(self):
+        """Delete the least recently written frames beyond ``disk_budget``."""
+        try:
+            entries = list(os.scandir(self.cache_dir))
+            # Frames in the older RGB PPM format are never read again
+            for entry in entries:
+                if entry.name.endswith(".ppm"):
+                    self._discard(entry.path)
+            entries = [e for e in entries if e.name.endswith(".pam")]
+            stats = [(e.stat().st_mtime, e.stat().st_size, e.path) for e in entries]
+        except OSError:
+            return
+        total = sum(size for _, size, _ in stats)
+        for _, size, path in sorted(stats):
+            if total <= self.disk_budget:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def set_memory_budget(self, byte_budget):
+        self._memory.set_budget(byte_budget)
+
+    def clear_memory(self):
+        self._memory.clear()
@@ -0,0 +1,100 @@
+"""Monitor geometry discovery for CVShield.
+
+Xinerama is asked first, through ctypes, since it reports the monitors that
+make up one logical X screen, which is what RandR setups and a
+``Xvfb +xinerama -screen 0 ... -screen 1 ...`` test server look like.
+Parsing ``xrandr --query`` is the fallback.
+"""
+import collections
+import ctypes
+import ctypes.util
+import os
+import re
+import subprocess
+
+Monitor = collections.namedtuple("Monitor", "x y width height name primary")
+
+_XRANDR_LINE = re.compile(r"^(\S+) connected (primary )?(\d+)x(\d+)\+(-?\d+)\+(-?\d+)")
+
+
+class _XineramaScreenInfo(ctypes.Structure):
+    _fields_ = [
+        ("screen_number", ctypes.c_int),
+        ("x_org", ctypes.c_short),
+        ("y_org", ctypes.c_short),
+        ("width", ctypes.c_short),
+        ("height", ctypes.c_short),
+    ]
+
+
+def xinerama_monitors(display=None):
+    """Return monitors reported by Xinerama, or [] if it is unavailable."""
+    xlib_name = ctypes.util.find_library("X11")
+    xin_name = ctypes.util.find_library("Xinerama")
+    if not xlib_name or not xin_name:
+        return []
+    xlib = ctypes.CDLL(xlib_name)
+    xin = ctypes.CDLL(xin_name)
+    xlib.XOpenDisplay.restype = ctypes.c_void_p
+    xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+    xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+    xlib.XFree.argtypes = [ctypes.c_void_p]
+    xin.XineramaIsActive.argtypes = [ctypes.c_void_p]
+    xin.XineramaQueryScreens.restype = ctypes.POINTER(_XineramaScreenInfo)
+    xin.XineramaQueryScreens.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int)]
+
+    dpy = xlib.XOpenDisplay(display.encode() if display else None)
+    if not dpy:
+        return []
+    try:
+        if not xin.XineramaIsActive(dpy):
+            return []
+        count = ctypes.c_int(0)
+        screens = xin.XineramaQueryScreens(dpy, ctypes.byref(count))
+        if not screens:
+            return []
+        try:
+            return [Monitor(s.x_org, s.y_org, s.width, s.height, "screen-%d" % s.screen_number, i == 0)
+                    for i, s in enumerate(screens[:count.value])]
+        finally:
+            xlib.XFree(screens)
+    finally:
+        xlib.XCloseDisplay(dpy)
+
+
+def parse_xrandr(output):
+    """Parse ``xrandr --query`` output into monitors."""
+    monitors = []
+    for line in output.splitlines():
+        match = _XRANDR_LINE.match(line)
+        if match:
+            name, primary, width, height, x, y = match.groups()
+            monitors.append(Monitor(int(x), int(y), int(width), int(height), name, bool(primary)))
+    return monitors
+
+
+def xrandr_monitors(display=None):
+    """Return monitors listed by the ``xrandr`` tool, or [] on failure."""
+    env = dict(os.environ)
+    if display:
+        env["DISPLAY"] = display
+    try:
+        output = subprocess.run(["xrandr", "--query"], capture_output=True, text=True,
+                                timeout=2, env=env, check=True).stdout
+    except (OSError, subprocess.SubprocessError):
+        return []
+    return parse_xrandr(output)
+
+
+def detect_monitors(display=None):
+    """Return the connected monitors, primary first; [] if unknown."""
+    monitors = xinerama_monitors(display) or xrandr_monitors(display)
+    # Mirrored outputs share a geometry; one overlay each is enough
+    unique = []
+    seen = set()
+    for monitor in sorted(monitors, key=lambda m: not m.primary):
+        geometry = (monitor.x, monitor.y, monitor.width, monitor.height)
+        if geometry not in seen:
+            seen.add(geometry)
+            unique.append(monitor)
+    return unique
@@ -0,0 +1,109 @@
+"""Background preparation of break assets for CVShield.
+
+Shortly before a break is due the prefetcher decodes and scales the scenery
+and picks the exercise text on a worker thread. When the break fires, the Tk
+thread only has to wrap the ready image in a PhotoImage.
+
+A blurred-desktop background cannot be prepared early, since it has to show
+the desktop as it is when the break starts. It is captured and blurred on a
+thread of its own while the Tk thread waits a bounded time for it.
+"""
+import collections
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+
+# ``images`` maps each requested (width, height) to a scaled image
+PreparedBreak = collections.namedtuple("PreparedBreak", "scenery_path sizes images exercise")
+
+
+class BreakPrefetcher:
+    """Prepare the next break's image and exercise ahead of time."""
+
+    def __init__(self, render_cache, choose_exercise, history=50):
+        self.render_cache = render_cache
+        self.choose_exercise = choose_exercise
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cvshield-prefetch")
+        self._capture_executor = None
+        self._pending = None
+        self._lock = threading.Lock()
+        # Seconds from break deadline to first painted frame, newest last
+        self.latencies = collections.deque(maxlen=history)
+        # Seconds each desktop capture took (None for one that timed out)
+        self.capture_times = collections.deque(maxlen=history)
+
+    def _prepare(self, scenery_path, sizes):
+        images = {}
+        if scenery_path:
+            try:
+                images = self.render_cache.get_many(scenery_path, sizes)
+            except Exception:
+                images = {}
+        return PreparedBreak(scenery_path, sizes, images, self.choose_exercise())
+
+    @staticmethod
+    def _normalize(sizes):
+        return tuple(sorted(set(tuple(size) for size in sizes)))
+
+    def prefetch(self, scenery_path, sizes):
+        """Start preparing a break for ``scenery_path`` at each of ``sizes``."""
+        with self._lock:
+            self._pending = self._executor.submit(self._prepare, scenery_path, self._normalize(sizes))
+            return self._pending
+
+    def take(self, scenery_path, sizes):
+        """Return the prepared break, preparing it synchronously on a miss.
+
+        A prefetch still in flight is waited for, since it is already part
+        way through the same work.
+        """
+        sizes = self._normalize(sizes)
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is not None:
+            try:
+                prepared = pending.result()
+            except Exception:
+                prepared = None
+            if prepared and prepared.scenery_path == scenery_path and prepared.sizes == sizes:
+                return prepared
+        return self._prepare(scenery_path, sizes)
+
+    def _capture(self, regions):
+        from cvshield_imaging import blurred_desktop
+        start = time.perf_counter()
+        frames = blurred_desktop(regions)
+        return frames, time.perf_counter() - start
+
+    def capture_desktop(self, regions, timeout):
+        """Return blurred desktop frames for ``regions``, or {} after ``timeout`` seconds.
+
+        See ``cvshield_imaging.blurred_desktop`` for ``regions``. A capture
+        that overruns is left to finish on its own and its result dropped.
+        """
+        if self._capture_executor is None:
+            self._capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cvshield-capture")
+        future = self._capture_executor.submit(self._capture, regions)
+        try:
+            frames, seconds = future.result(timeout)
+        except TimeoutError:
+            self.capture_times.append(None)
+            return {}
+        except Exception:
+            # No X display, no screen-grab support, denied by the compositor...
+            return {}
+        self.capture_times.append(seconds)
+        return frames
+
+    def record_latency(self, seconds):
+        self.latencies.append(seconds)
+
+    @property
+    def last_latency(self):
+        return self.latencies[-1] if self.latencies else None
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+        if self._capture_executor is not None:
+            self._capture_executor.shutdown(wait=False)
@@ -0,0 +1,92 @@
+"""Rotating library of break background photos for CVShield.
+
+The library only remembers file names. The directory is re-listed when its
+own mtime changes (files were added, removed or renamed), and never more
+often than ``rescan_interval`` seconds, so picking the next photo normally
+costs a single ``stat`` of the directory.
+"""
+import os
+import random
+import time
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".webp", ".tif", ".tiff")
+
+ORDER_SHUFFLE = "shuffle"
+ORDER_SEQUENTIAL = "sequential"
+
+
+class SceneryLibrary:
+    """Hand out photos from a directory, shuffled or in name order."""
+
+    def __init__(self, directory, order=ORDER_SHUFFLE, rescan_interval=60,
+                 clock=time.monotonic, rng=None):
+        self.directory = directory
+        self.order = order
+        self.rescan_interval = rescan_interval
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self._names = set()
+        self._dir_mtime = None
+        self._last_check = None
+        # Names still to be shown in the current pass, next one last
+        self._deck = []
+        self._last_name = None
+
+    def _scan(self):
+        """Re-list the directory if it changed since the last scan."""
+        now = self.clock()
+        if self._last_check is not None and now - self._last_check < self.rescan_interval:
+            return
+        self._last_check = now
+        try:
+            mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            self._names = set()
+            self._deck = []
+            return
+        if mtime == self._dir_mtime:
+            return
+        self._dir_mtime = mtime
+        names = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                # d_type from scandir avoids a stat per file on most filesystems
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    names.add(entry.name)
+        added = names - self._names
+        self._names = names
+        # Keep the current pass, dropping deleted files and queueing new ones
+        self._deck = [name for name in self._deck if name in names]
+        if added:
+            if self.order == ORDER_SEQUENTIAL:
+                # Names sorting before the current position wait for the next pass
+                ahead = {n for n in added if self._last_name is None or n > self._last_name}
+                self._deck = sorted(set(self._deck) | ahead, reverse=True)
+            else:
+                for name in added:
+                    self._deck.insert(self.rng.randint(0, len(self._deck)), name)
+
+    def _refill(self):
+        if self.order == ORDER_SEQUENTIAL:
+            self._deck = sorted(self._names, reverse=True)
+        else:
+            self._deck = list(self._names)
+            self.rng.shuffle(self._deck)
+            # Avoid showing the same photo twice in a row across passes
+            if len(self._deck) > 1 and self._deck[-1] == self._last_name:
+                self._deck[0], self._deck[-1] = self._deck[-1], self._deck[0]
+
+    def __len__(self):
+        self._scan()
+        return len(self._names)
+
+    def next_path(self):
+        """Return the path of the next photo, or None if there are none."""
+        self._scan()
+        if not self._deck:
+            self._refill()
+        if not self._deck:
+            return None
+        name = self._deck.pop()
+        self._last_name = name
+        return os.path.join(self.directory, name)
@@ -0,0 +1,411 @@
+"""Deadline-driven work/break scheduler for CVShield.
+
+The scheduler knows nothing about Tk or the tray. A host asks it how long it
+may sleep (``next_wakeup``), sleeps that long by whatever means it has
+(``root.after``, ``time.sleep``, an asyncio timer...), then calls ``poll``.
+Subscribers are notified of state transitions and of ticks where the
+displayed countdown actually changed.
+
+By default there is one break of ``break_duration`` every ``break_interval``
+seconds. ``set_schedules`` replaces that with several named schedules (say
+20-second eye breaks every 20 minutes and 5-minute stretches every hour).
+Their deadlines are kept in a heap on a clock of "active" seconds that
+stops during pauses and breaks, so the earliest one is the work period's
+deadline and the host still arms a single wakeup. When it comes up, every
+schedule due within ``coalesce_window`` seconds is folded into one break,
+the longest of them, and that break also counts for every schedule whose
+breaks are no longer than it.
+"""
+import collections
+import heapq
+import math
+import time
+
+STOPPED = "stopped"
+WORKING = "working"
+PAUSED = "paused"
+ON_BREAK = "break"
+
+# Events passed to subscribers
+EVENT_STATE = "state"
+EVENT_TICK = "tick"
+# Fired once per work period, ``prewarm_lead`` seconds before the break
+EVENT_PREWARM = "prewarm"
+
+# Wake slightly after a display boundary so int() has already rolled over
+_WAKE_SLACK = 0.001
+
+# ``category`` picks the exercises shown and ``message`` is shown with them
+Schedule = collections.namedtuple("Schedule", "name interval duration category message",
+                                  defaults=(None, None))
+
+
+def schedule_from_config(config):
+    """Build a Schedule from a settings entry; raises ValueError if it is invalid."""
+    try:
+        schedule = Schedule(str(config["name"]), float(config["interval"]), float(config["duration"]),
+                            config.get("category"), config.get("message"))
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        raise ValueError("bad schedule: %s" % e)
+    if schedule.interval <= 0 or schedule.duration <= 0:
+        raise ValueError("interval and duration must be positive")
+    return schedule
+
+
+class BreakScheduler:
+    """Work/break/paused state machine driven by a monotonic clock."""
+
+    def __init__(self, break_interval=0, break_duration=0, clock=time.monotonic):
+        self.clock = clock
+        self.break_interval = break_interval
+        self.break_duration = break_duration
+        self.state = STOPPED
+        self.previous_state = STOPPED
+        # How long the scheduler spent in previous_state before the last transition
+        self.previous_state_duration = 0.0
+        self._state_since = clock()
+        # Seconds between visible countdown changes; 1 for a seconds display
+        self.granularity = 1.0
+        # Number of distinguishable progress steps during a break
+        self.progress_resolution = 100
+        # Seconds before the break deadline at which EVENT_PREWARM fires
+        self.prewarm_lead = 0
+        self._prewarm_sent = False
+        # Clock time the current break was due, for latency measurements
+        self.break_due = None
+        self._work_start = None
+        self._paused_at = None
+        self._break_start = None
+        self._break_length = 0
+        self._listeners = []
+        # Named schedules; empty means the single break_interval/break_duration pair
+        self.schedules = collections.OrderedDict()
+        self.coalesce_window = 0.0
+        # The schedule the current (or last) break was taken for
+        self.current_schedule = None
+        # Active seconds (pauses and breaks excluded) before the current work period
+        self._active_offset = 0.0
+        # Active time at which each schedule last had its break
+        self._reset_at = {}
+        # [due, sequence, name, generation]; outdated entries are skipped, not removed
+        self._heap = []
+        self._generation = {}
+        self._sequence = 0
+
+    def subscribe(self, callback):
+        """Register ``callback(scheduler, event)``; returns it for unsubscribe."""
+        self._listeners.append(callback)
+        return callback
+
+    def unsubscribe(self, callback):
+        try:
+            self._listeners.remove(callback)
+        except ValueError:
+            pass
+
+    def _notify(self, event):
+        for callback in list(self._listeners):
+            callback(self, event)
+
+    def _set_state(self, state, now):
+        self.previous_state = self.state
+        self.previous_state_duration = now - self._state_since
+        self._state_since = now
+        self.state = state
+        self._notify(EVENT_STATE)
+
+    # -- transitions -----------------------------------------------------
+
+    def configure(self, break_interval=None, break_duration=None):
+        """Change interval/duration without restarting the current cycle."""
+        if break_interval is not None:
+            self.break_interval = break_interval
+        if break_duration is not None:
+            self.break_duration = break_duration
+
+    def set_schedules(self, schedules, coalesce_window=None):
+        """Drive breaks from ``schedules`` (Schedule tuples); an empty list restores the single pair.
+
+        Schedules that keep their name keep their progress, so a changed
+        interval applies to the cycle under way; new ones start counting now.
+        """
+        if coalesce_window is not None:
+            self.coalesce_window = coalesce_window
+        active = self._active_time()
+        self.schedules = collections.OrderedDict((schedule.name, schedule) for schedule in schedules)
+        self._reset_at = {name: self._reset_at.get(name, active) for name in self.schedules}
+        self._rebuild_heap()
+
+    def _rebuild_heap(self):
+        self._heap = []
+        self._generation = {}
+        for name, at in self._reset_at.items():
+            self._push(name, at)
+
+    def _push(self, name, at):
+        self._reset_at[name] = at
+        generation = self._generation[name] = self._generation.get(name, 0) + 1
+        self._sequence += 1
+        heapq.heappush(self._heap, [at + self.schedules[name].interval, self._sequence, name, generation])
+        if len(self._heap) > 4 * len(self.schedules) + 16:
+            # Too many outdated entries; start over with the live ones
+            self._rebuild_heap()
+
+    def _next_due(self):
+        """Active time of the earliest schedule deadline (multiple schedules only)."""
+        heap = self._heap
+        while heap and heap[0][3] != self._generation.get(heap[0][2]):
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def _active_time(self, now=None):
+        if self.state == WORKING:
+            now = self.clock() if now is None else now
+            return self._active_offset + now - self._work_start
+        if self.state == PAUSED:
+            return self._active_offset + self._paused_at - self._work_start
+        return self._active_offset
+
+    def _due_by(self, active):
+        """Schedules a break at active time ``active`` covers, longest break first.
+
+        That is the earliest one due (even if not yet due, for a break taken
+        early) and any other due within ``coalesce_window`` of it.
+        """
+        limit = max(active, self._next_due()) + self.coalesce_window
+        due = [s for s in self.schedules.values() if self._reset_at[s.name] + s.interval <= limit]
+        due.sort(key=lambda s: (-s.duration, self._reset_at[s.name] + s.interval))
+        return due
+
+    def upcoming_break(self, now=None):
+        """The Schedule the next break will be for, or None with a single pair."""
+        if not self.schedules:
+            return None
+        return self._due_by(self._active_time(now))[0]
+
+    def _credit_break(self, length, active, folded=()):
+        """Restart every schedule a break of ``length`` seconds satisfies."""
+        for schedule in self.schedules.values():
+            if schedule.duration <= length or schedule.name in folded:
+                self._push(schedule.name, active)
+
+    def current_interval(self):
+        """Length of the current work period's countdown, in seconds."""
+        if not self.schedules:
+            return self.break_interval
+        return self._next_due() - self._active_offset
+
+    def start(self, now=None):
+        """Begin a fresh work period."""
+        now = self.clock() if now is None else now
+        if self.schedules:
+            self._active_offset = 0.0
+            self._reset_at = dict.fromkeys(self.schedules, 0.0)
+            self._rebuild_heap()
+        self._work_start = now
+        self._paused_at = None
+        self._break_start = None
+        self._prewarm_sent = False
+        self._set_state(WORKING, now)
+
+    def stop(self, now=None):
+        now = self.clock() if now is None else now
+        self._work_start = None
+        self._paused_at = None
+        self._break_start = None
+        self._set_state(STOPPED, now)
+
+    def pause(self, now=None):
+        """Pause the work period, optionally backdated to ``now``.
+
+        A backdated pause never reaches back before the scheduler entered
+        the working state, so no time before a start, break end or resume
+        is taken off.
+        """
+        if self.state != WORKING:
+            return False
+        self._paused_at = self.clock() if now is None else max(now, self._state_since)
+        self._set_state(PAUSED, self._paused_at)
+        return True
+
+    def resume(self, now=None):
+        if self.state != PAUSED:
+            return False
+        now = self.clock() if now is None else now
+        # Shift the work start so the paused span is not counted
+        self._work_start += now - self._paused_at
+        self._paused_at = None
+        self._set_state(WORKING, now)
+        return True
+
+    def start_break(self, duration=None, now=None, due=None):
+        """Enter the break state, optionally with an explicit length.
+
+        With multiple schedules and no explicit length, the break is the one
+        ``upcoming_break`` names.
+        """
+        self._break_start = self.clock() if now is None else now
+        self.break_due = self._break_start if due is None else due
+        if self.schedules:
+            active = self._active_time(self._break_start)
+            self._active_offset = active
+            folded = ()
+            self.current_schedule = None
+            if duration is None:
+                due = self._due_by(active)
+                self.current_schedule = due[0]
+                duration = due[0].duration
+                folded = [s.name for s in due]
+            self._credit_break(duration, active, folded)
+        self._break_length = self.break_duration if duration is None else duration
+        self._paused_at = None
+        self._set_state(ON_BREAK, self._break_start)
+
+    def end_break(self, now=None):
+        """Leave the break and count a full interval from now."""
+        if self.state != ON_BREAK:
+            return False
+        self._work_start = self.clock() if now is None else now
+        self._break_start = None
+        self._prewarm_sent = False
+        self._set_state(WORKING, self._work_start)
+        return True
+
+    def end_absence(self, away_seconds, now=None):
+        """Resume after an idle pause, counting the absence as a break where it was long enough.
+
+        With the single pair, an absence of at least ``break_duration``
+        starts a fresh interval. With schedules, only those whose breaks are
+        no longer than the absence restart; the rest keep their progress.
+        Returns True if the absence counted as a break for anything.
+        """
+        if self.state != PAUSED:
+            return False
+        now = self.clock() if now is None else now
+        if not self.schedules:
+            if away_seconds < self.break_duration:
+                self.resume(now)
+                return False
+            self.start(now=now)
+            return True
+        covered = any(schedule.duration <= away_seconds for schedule in self.schedules.values())
+        if covered:
+            self._credit_break(away_seconds, self._active_time())
+            self._prewarm_sent = False
+        self.resume(now)
+        return covered
+
+    def restore(self, state, elapsed, break_length=0.0, now=None):
+        """Resume a saved cycle ``elapsed`` seconds into its phase."""
+        now = self.clock() if now is None else now
+        if self.schedules:
+            # Only the phase is saved, so every schedule counts from its start
+            self._active_offset = 0.0
+            self._reset_at = dict.fromkeys(self.schedules, 0.0)
+            self._rebuild_heap()
+        if state == ON_BREAK:
+            self._work_start = None
+            self.start_break(duration=break_length, now=now - elapsed)
+            # Not a late break, so keep it out of the latency figures
+            self.break_due = None
+            return
+        self._work_start = now - elapsed
+        self._break_start = None
+        self._prewarm_sent = False
+        if state == PAUSED:
+            self._paused_at = now
+            self._set_state(PAUSED, now)
+        else:
+            self._paused_at = None
+            self._set_state(WORKING, now)
+            if self.remaining(now) <= 0:
+                # Came due while the app was gone: break now, and since that
+                # is not a late break, keep it out of the latency figures
+                self.start_break(now=now)
+                self.break_due = None
+
+    # -- queries ---------------------------------------------------------
+
+    def phase_elapsed(self, now=None):
+        """Seconds into the current work period (pauses excluded) or break."""
+        now = self.clock() if now is None else now
+        if self.state == WORKING:
+            return now - self._work_start
+        if self.state == PAUSED:
+            return self._paused_at - self._work_start
+        if self.state == ON_BREAK:
+            return now - self._break_start
+        return 0.0
+
+    @property
+    def is_running(self):
+        return self.state in (WORKING, PAUSED)
+
+    @property
+    def is_paused(self):
+        return self.state == PAUSED
+
+    def remaining(self, now=None):
+        """Seconds left in the current phase, or None when stopped."""
+        now = self.clock() if now is None else now
+        if self.state == WORKING:
+            return self.current_interval() - (now - self._work_start)
+        if self.state == PAUSED:
+            return self.current_interval() - (self._paused_at - self._work_start)
+        if self.state == ON_BREAK:
+            return max(0.0, self._break_length - (now - self._break_start))
+        return None
+
+    def break_progress(self, now=None):
+        """Fraction of the current break already elapsed (0.0 - 1.0)."""
+        if self.state != ON_BREAK or self._break_length <= 0:
+            return 0.0
+        now = self.clock() if now is None else now
+        return min(1.0, max(0.0, (now - self._break_start) / self._break_length))
+
+    @property
+    def break_length(self):
+        return self._break_length
+
+    def next_wakeup(self, now=None):
+        """Seconds until the next deadline or visible change; None if idle.
+
+        Paused and stopped states never change on their own, so hosts should
+        not schedule anything for them.
+        """
+        if self.state not in (WORKING, ON_BREAK):
+            return None
+        now = self.clock() if now is None else now
+        remaining = self.remaining(now)
+        if remaining <= 0:
+            return 0.0
+        step = self.granularity
+        delay = remaining - math.floor(remaining / step) * step + _WAKE_SLACK
+        if self.state == ON_BREAK and self.progress_resolution and self._break_length > 0:
+            slice_len = self._break_length / self.progress_resolution
+            elapsed = now - self._break_start
+            next_step = (math.floor(elapsed / slice_len) + 1) * slice_len
+            delay = min(delay, next_step - elapsed + _WAKE_SLACK)
+        if self.state == WORKING and self.prewarm_lead > 0 and not self._prewarm_sent:
+            until_prewarm = remaining - self.prewarm_lead
+            if until_prewarm > 0:
+                delay = min(delay, until_prewarm + _WAKE_SLACK)
+        return max(0.0, min(delay, remaining + _WAKE_SLACK))
+
+    def poll(self, now=None):
+        """Advance past any expired deadline and notify subscribers.
+
+        Returns the delay until the next wakeup (see ``next_wakeup``).
+        """
+        now = self.clock() if now is None else now
+        if self.state == WORKING and self.remaining(now) <= 0:
+            self.start_break(now=now, due=self._work_start + self.current_interval())
+        elif self.state == ON_BREAK and self.remaining(now) <= 0:
+            self.end_break(now=now)
+        elif self.state in (WORKING, ON_BREAK):
+            if (self.state == WORKING and self.prewarm_lead > 0 and not self._prewarm_sent
+                    and self.remaining(now) <= self.prewarm_lead):
+                self._prewarm_sent = True
+                self._notify(EVENT_PREWARM)
+            self._notify(EVENT_TICK)
+        return self.next_wakeup(now)
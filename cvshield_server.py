@@ -0,0 +1,517 @@
+"""Headless multi-user break scheduler for CVShield.
+
+Thin-client and VDI setups can run one of these instead of a Tk process per
+user. Every user's timer is a small slotted record; all pending deadlines
+share one heap, and a single asyncio task sleeps until the earliest one.
+Cancelling or rescheduling only bumps the record's generation, leaving the
+old heap entry to be skipped when it surfaces, so every operation is
+O(log n) at worst whatever the number of users.
+
+Clients connect over a Unix socket (or TCP) and speak the same
+line-delimited JSON as the control socket, with a ``user`` field::
+
+    {"cmd": "subscribe", "user": "alice"}
+    {"cmd": "start", "user": "alice"}
+
+Subscribers get ``{"event": "break_start", ...}`` and ``break_end`` lines
+pushed as deadlines fire. Each user's interval and duration are read from
+and saved to ``<settings-dir>/<user>/cvshield_settings.json``, in the same
+format the desktop app uses.
+
+Every request must come from the user it names. On the Unix socket (which
+any local user can connect to) the caller is identified by its peer
+credentials: a user id matching the caller's login name, or any user id for
+root and the account running the server. Otherwise, and always over TCP,
+the request needs a ``"token"`` field, which ``cvshield serve --issue-token
+<user>`` prints for that user.
+"""
+import argparse
+import asyncio
+import hashlib
+import hmac
+import heapq
+import itertools
+import json
+import math
+import os
+import re
+import secrets
+import socket
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from cvshield_control import make_private_dir
+from cvshield_scheduler import STOPPED, WORKING, PAUSED, ON_BREAK
+from cvshield_settings import SETTINGS_FILENAME, SettingsStore
+
+DEFAULT_BREAK_INTERVAL = 20 * 60
+DEFAULT_BREAK_DURATION = 30
+
+# Drop a subscriber whose unread output grows past this
+MAX_CLIENT_BACKLOG = 1024 * 1024
+
+# Starts alphanumeric, so "." and ".." (and hidden names) are never user ids
+_USER_ID = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.@-]{0,63}$")
+
+
+def _positive_seconds(name, value):
+    """Return ``value`` if it is a positive number of seconds, else raise ValueError."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0 < value < math.inf:
+        raise ValueError("%s must be a positive number of seconds" % name)
+    return value
+
+
+def default_server_socket_path():
+    """Return the server socket path, in a directory other users can pass through."""
+    return os.path.join("/tmp", "cvshield-serve-%d" % os.getuid(), "server.sock")
+
+
+def load_server_key(settings_dir):
+    """Return the secret tokens are derived from, creating it (mode 0600) if needed."""
+    path = os.path.join(settings_dir, ".server-key")
+    try:
+        with open(path, "r") as fh:
+            return bytes.fromhex(fh.read().strip())
+    except FileNotFoundError:
+        pass
+    os.makedirs(settings_dir, mode=0o700, exist_ok=True)
+    key = secrets.token_bytes(32)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "w") as fh:
+        fh.write(key.hex() + "\n")
+    return key
+
+
+def user_token(key, user):
+    """The token that lets a client act as ``user``."""
+    return hmac.new(key, user.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def _peer_identity(sock):
+    """Return (uid, login name) of the process at the other end of a Unix socket.
+
+    Returns (None, None) where peer credentials are unavailable (TCP, or
+    platforms without SO_PEERCRED). Looking the name up can block on NSS,
+    so this runs off the event loop.
+    """
+    if sock is None or sock.family != getattr(socket, "AF_UNIX", None) or not hasattr(socket, "SO_PEERCRED"):
+        return None, None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    _, uid, _ = struct.unpack("3i", creds)
+    try:
+        import pwd
+        return uid, pwd.getpwuid(uid).pw_name
+    except (ImportError, KeyError):
+        return uid, None
+
+
+def default_settings_dir():
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "cvshield", "users")
+
+
+class UserTimer:
+    """One user's work/break state; deadlines are scheduler clock times."""
+
+    __slots__ = ("user", "break_interval", "break_duration", "state",
+                 "deadline", "paused_remaining", "generation")
+
+    def __init__(self, user, break_interval, break_duration):
+        self.user = user
+        self.break_interval = break_interval
+        self.break_duration = break_duration
+        self.state = STOPPED
+        self.deadline = None
+        self.paused_remaining = None
+        self.generation = 0
+
+    def remaining(self, now):
+        if self.state == PAUSED:
+            return self.paused_remaining
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - now)
+
+
+class TimerHeap:
+    """Min-heap of timer deadlines with lazy cancellation."""
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._stale = 0
+
+    def __len__(self):
+        return len(self._heap) - self._stale
+
+    def schedule(self, timer, deadline):
+        self.cancel(timer)
+        timer.deadline = deadline
+        heapq.heappush(self._heap, (deadline, next(self._seq), timer, timer.generation))
+
+    def cancel(self, timer):
+        if timer.deadline is None:
+            return
+        timer.generation += 1
+        timer.deadline = None
+        self._stale += 1
+        # Rebuild once dead entries dominate, so memory tracks live timers
+        if self._stale > 1024 and self._stale > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if entry[3] == entry[2].generation]
+            heapq.heapify(self._heap)
+            self._stale = 0
+
+    def _drop_stale_top(self):
+        heap = self._heap
+        while heap and heap[0][3] != heap[0][2].generation:
+            heapq.heappop(heap)
+            self._stale -= 1
+
+    def next_deadline(self):
+        self._drop_stale_top()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return the timers whose deadline is at or before ``now``."""
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, _, timer, generation = heapq.heappop(heap)
+            if generation != timer.generation:
+                self._stale -= 1
+                continue
+            timer.deadline = None
+            due.append(timer)
+        return due
+
+
+class BreakService:
+    """All users' timers plus the commands that drive them.
+
+    ``on_event(timer, event)`` is called for ``break_start`` and
+    ``break_end``. Nothing here awaits, so the service can be driven by a
+    fake clock in benchmarks; ``serve`` adds the asyncio side.
+    """
+
+    def __init__(self, settings_dir=None, clock=time.monotonic, on_event=None):
+        self.settings_dir = settings_dir
+        self.clock = clock
+        self.on_event = on_event
+        self.timers = {}
+        self.heap = TimerHeap()
+        # Set when a new deadline may be earlier than the one being slept on
+        self.wakeup = None
+
+    # -- settings --------------------------------------------------------
+
+    def _settings_store(self, user):
+        root = os.path.realpath(self.settings_dir)
+        user_dir = os.path.realpath(os.path.join(root, user))
+        # Also refuses a user directory that is a symlink out of the tree
+        if os.path.dirname(user_dir) != root:
+            raise ValueError("invalid user id: %r" % user)
+        return SettingsStore(path=os.path.join(user_dir, SETTINGS_FILENAME), coalesce_delay=0)
+
+    def load_settings(self, user):
+        """Return ``user``'s saved (break_interval, break_duration), or the defaults.
+
+        Reads the settings file, so the server calls it off the event loop.
+        """
+        if not _USER_ID.match(user):
+            raise ValueError("invalid user id: %r" % user)
+        interval, duration = DEFAULT_BREAK_INTERVAL, DEFAULT_BREAK_DURATION
+        if self.settings_dir:
+            settings = self._settings_store(user).load() or {}
+            # A hand-edited file with bad values falls back to the defaults
+            try:
+                interval = _positive_seconds("break_interval", settings.get("break_interval"))
+            except ValueError:
+                pass
+            try:
+                duration = _positive_seconds("break_duration", settings.get("break_duration"))
+            except ValueError:
+                pass
+        return interval, duration
+
+    def save_settings(self, user, break_interval, break_duration):
+        """Write ``user``'s interval and duration to their settings file (blocking)."""
+        if not self.settings_dir:
+            return
+        store = self._settings_store(user)
+        settings = store.load() or {}
+        settings.update(break_interval=break_interval, break_duration=break_duration)
+        store.save(settings, immediate=True)
+
+    def timer_for(self, user, settings=None):
+        """Return ``user``'s timer, creating it from ``settings`` (or the saved ones)."""
+        timer = self.timers.get(user)
+        if timer is None:
+            interval, duration = settings or self.load_settings(user)
+            timer = self.timers[user] = UserTimer(user, interval, duration)
+        return timer
+
+    def configure(self, user, break_interval=None, break_duration=None, save=True):
+        """Change a user's settings without restarting their current cycle.
+
+        Raises ValueError unless each given value is a positive number. With
+        ``save`` false the caller writes the settings file itself.
+        """
+        if break_interval is not None:
+            _positive_seconds("break_interval", break_interval)
+        if break_duration is not None:
+            _positive_seconds("break_duration", break_duration)
+        timer = self.timer_for(user)
+        if break_interval is not None:
+            if timer.state == WORKING:
+                self._schedule(timer, timer.deadline + break_interval - timer.break_interval)
+            elif timer.state == PAUSED:
+                timer.paused_remaining = max(0.0, timer.paused_remaining + break_interval - timer.break_interval)
+            timer.break_interval = break_interval
+        if break_duration is not None:
+            timer.break_duration = break_duration
+        if save:
+            self.save_settings(user, timer.break_interval, timer.break_duration)
+        return timer
+
+    # -- commands --------------------------------------------------------
+
+    def _schedule(self, timer, deadline):
+        self.heap.schedule(timer, deadline)
+        if self.wakeup is not None:
+            self.wakeup()
+
+    def start(self, user):
+        timer = self.timer_for(user)
+        timer.state = WORKING
+        timer.paused_remaining = None
+        self._schedule(timer, self.clock() + timer.break_interval)
+
+    def stop(self, user):
+        timer = self.timer_for(user)
+        self.heap.cancel(timer)
+        timer.state = STOPPED
+        timer.paused_remaining = None
+
+    def pause(self, user):
+        timer = self.timer_for(user)
+        if timer.state != WORKING:
+            return
+        timer.paused_remaining = timer.remaining(self.clock())
+        self.heap.cancel(timer)
+        timer.state = PAUSED
+
+    def resume(self, user):
+        timer = self.timer_for(user)
+        if timer.state != PAUSED:
+            return
+        timer.state = WORKING
+        self._schedule(timer, self.clock() + timer.paused_remaining)
+        timer.paused_remaining = None
+
+    def break_now(self, user):
+        timer = self.timer_for(user)
+        if timer.state != ON_BREAK:
+            self._begin_break(timer, self.clock())
+
+    def status(self, user, settings=None):
+        """Report ``user``'s timer; an unknown user is reported stopped, not added."""
+        timer = self.timers.get(user)
+        if timer is None:
+            interval, duration = settings or self.load_settings(user)
+            return {"user": user, "state": STOPPED, "remaining": None,
+                    "break_interval": interval, "break_duration": duration}
+        return {"user": user, "state": timer.state, "remaining": timer.remaining(self.clock()),
+                "break_interval": timer.break_interval, "break_duration": timer.break_duration}
+
+    # -- deadlines -------------------------------------------------------
+
+    def _begin_break(self, timer, now):
+        timer.state = ON_BREAK
+        timer.paused_remaining = None
+        self._schedule(timer, now + timer.break_duration)
+        if self.on_event:
+            self.on_event(timer, "break_start")
+
+    def fire(self, now=None):
+        """Advance every timer whose deadline has passed; returns how many."""
+        now = self.clock() if now is None else now
+        due = self.heap.pop_due(now)
+        for timer in due:
+            try:
+                self._fire_timer(timer, now)
+            except Exception as e:
+                # One user's failure must not stop everyone else's breaks
+                self.heap.cancel(timer)
+                timer.state = STOPPED
+                timer.paused_remaining = None
+                print("cvshield serve: stopped timer for %s: %r" % (timer.user, e), file=sys.stderr)
+        return len(due)
+
+    def _fire_timer(self, timer, now):
+        if timer.state == WORKING:
+            self._begin_break(timer, now)
+        elif timer.state == ON_BREAK:
+            timer.state = WORKING
+            self.heap.schedule(timer, now + timer.break_interval)
+            if self.on_event:
+                self.on_event(timer, "break_end")
+
+
+class BreakServer:
+    """asyncio front end: one timer task plus line-delimited JSON clients."""
+
+    COMMANDS = ("status", "start", "stop", "pause", "resume", "break_now", "configure", "subscribe")
+
+    def __init__(self, service, key=None):
+        self.service = service
+        # Secret for per-user tokens; None accepts peer credentials only
+        self.key = key
+        service.on_event = self._push
+        self._subscribers = {}
+        self._wake = None
+        # Settings files and user lookups, in order, off the event loop
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cvshield-serve-io")
+
+    def _authorized(self, user, token, peer):
+        """Whether the caller may act as ``user``; ``peer`` is (uid, login name)."""
+        if isinstance(token, str) and self.key is not None:
+            return hmac.compare_digest(token.encode("utf-8"), user_token(self.key, user).encode("ascii"))
+        uid, name = peer
+        if uid is None:
+            return False
+        return uid in (0, os.getuid()) or name == user
+
+    async def _run_io(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._io, func, *args)
+
+    def _push(self, timer, event):
+        writers = self._subscribers.get(timer.user)
+        if not writers:
+            return
+        line = (json.dumps({"event": event, "user": timer.user, "state": timer.state,
+                            "remaining": timer.remaining(self.service.clock())}) + "\n").encode("utf-8")
+        for writer in list(writers):
+            if writer.transport.get_write_buffer_size() > MAX_CLIENT_BACKLOG:
+                writers.discard(writer)
+                writer.close()
+            else:
+                writer.write(line)
+
+    async def _run_timers(self):
+        self._wake = asyncio.Event()
+        self.service.wakeup = self._wake.set
+        while True:
+            deadline = self.service.heap.next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - self.service.clock())
+            self._wake.clear()
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self.service.fire()
+
+    async def handle_request(self, request, writer=None, peer=(None, None)):
+        """Run one decoded request and return the reply dict."""
+        command = request.get("cmd")
+        user = request.get("user")
+        if command not in self.COMMANDS or not isinstance(user, str):
+            return {"ok": False, "error": "bad request"}
+        if not self._authorized(user, request.get("token"), peer):
+            return {"ok": False, "error": "not allowed to act as %r" % user}
+        service = self.service
+        try:
+            settings = None
+            if user not in service.timers:
+                settings = await self._run_io(service.load_settings, user)
+            if command == "status":
+                # Read-only: an unknown user is not given a timer
+                return {"ok": True, "status": service.status(user, settings)}
+            timer = service.timer_for(user, settings)
+            if command == "subscribe":
+                self._subscribers.setdefault(user, set()).add(writer)
+            elif command == "configure":
+                service.configure(user, request.get("break_interval"), request.get("break_duration"), save=False)
+                await self._run_io(service.save_settings, user, timer.break_interval, timer.break_duration)
+            else:
+                getattr(service, command)(user)
+        except (ValueError, TypeError, OSError) as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True}
+
+    async def _handle_client(self, reader, writer):
+        try:
+            peer = await self._run_io(_peer_identity, writer.get_extra_info("socket"))
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError
+                except ValueError:
+                    reply = {"ok": False, "error": "bad request"}
+                else:
+                    reply = await self.handle_request(request, writer, peer)
+                writer.write((json.dumps(reply) + "\n").encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            for writers in self._subscribers.values():
+                writers.discard(writer)
+            writer.close()
+
+    async def serve(self, path=None, host=None, port=None):
+        if port is not None:
+            server = await asyncio.start_server(self._handle_client, host or "127.0.0.1", port)
+        else:
+            # Other users may pass through but not list or add entries;
+            # who may act as which user is decided per request
+            make_private_dir(os.path.dirname(path), mode=0o711)
+            if os.path.exists(path):
+                os.unlink(path)
+            server = await asyncio.start_unix_server(self._handle_client, path)
+            os.chmod(path, 0o666)
+        timers = asyncio.ensure_future(self._run_timers())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            timers.cancel()
+            self._io.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="cvshield serve", description="Headless multi-user break scheduler")
+    parser.add_argument("--socket", default=default_server_socket_path(),
+                        help="Unix socket to listen on (default: %(default)s)")
+    parser.add_argument("--port", type=int, help="listen on TCP instead of the Unix socket (tokens only)")
+    parser.add_argument("--host", default="127.0.0.1", help="TCP address (default: %(default)s)")
+    parser.add_argument("--settings-dir", default=default_settings_dir(),
+                        help="per-user settings root (default: %(default)s)")
+    parser.add_argument("--issue-token", metavar="USER", help="print the token for USER and exit")
+    args = parser.parse_args(argv)
+    try:
+        key = load_server_key(args.settings_dir)
+    except (OSError, ValueError) as e:
+        print("cvshield serve: cannot read the server key: %s" % e, file=sys.stderr)
+        return 1
+    if args.issue_token:
+        if not _USER_ID.match(args.issue_token):
+            print("cvshield serve: invalid user id: %r" % args.issue_token, file=sys.stderr)
+            return 2
+        print(user_token(key, args.issue_token))
+        return 0
+    server = BreakServer(BreakService(args.settings_dir), key)
+    try:
+        asyncio.run(server.serve(args.socket, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
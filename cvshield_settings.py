@@ -0,0 +1,302 @@
+"""Persistent settings for CVShield.
+
+Settings live in ``$XDG_CONFIG_HOME/cvshield/cvshield_settings.json``. Writes
+go to a temporary file that is fsynced and renamed over the old one, so a
+crash or a flaky network home directory never leaves a partial file behind.
+Saves made in quick succession are coalesced into a single write, and saves
+that would not change anything are skipped.
+
+``SettingsWatcher`` notices when something else (an editor, a fleet
+management tool) changes the file, through inotify where the platform has it
+and otherwise by comparing ``stat`` results on a backoff.
+"""
+import json
+import os
+import struct
+import tempfile
+import threading
+
+SETTINGS_FILENAME = "cvshield_settings.json"
+SCHEMA_VERSION = 2
+
+
+def default_settings_path():
+    """Return the per-user settings path under the XDG config directory."""
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "cvshield", SETTINGS_FILENAME)
+
+
+def _migrate_v1(settings):
+    # Version 1 was the unversioned file written next to the working directory
+    settings["schema_version"] = 2
+    return settings
+
+
+# Maps a schema version to the function upgrading it to the next version
+MIGRATIONS = {
+    1: _migrate_v1,
+}
+
+
+def migrate(settings):
+    """Upgrade ``settings`` in place to SCHEMA_VERSION; return (settings, changed)."""
+    version = settings.get("schema_version", 1)
+    changed = False
+    while version < SCHEMA_VERSION:
+        settings = MIGRATIONS[version](settings)
+        version = settings["schema_version"]
+        changed = True
+    return settings, changed
+
+
+def atomic_write_json(path, data):
+    """Write ``data`` as JSON to ``path`` via temp file, fsync and rename."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".cvshield-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    # Persist the rename itself; not every platform lets us open a directory
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+class SettingsStore:
+    """Load and save the settings file with coalesced, atomic writes."""
+
+    def __init__(self, path=None, legacy_paths=(), coalesce_delay=0.5):
+        self.path = path or default_settings_path()
+        self.legacy_paths = [p for p in legacy_paths if p]
+        self.coalesce_delay = coalesce_delay
+        # Guards the fields below; never held while the disk is touched
+        self._lock = threading.Lock()
+        # Serializes writers, so a newer snapshot is never overwritten by an older one
+        self._write_lock = threading.Lock()
+        self._pending = None
+        self._timer = None
+        self._last_written = None
+        # The settings being written right now, if any
+        self._in_flight = None
+        self.writes = 0
+
+    def _read(self, path):
+        with open(path, "r") as file:
+            settings = json.load(file)
+        if not isinstance(settings, dict):
+            raise ValueError("settings file does not contain an object")
+        return settings
+
+    def load(self):
+        """Return the stored settings dict, or None if there are none.
+
+        An older schema is migrated and written back. If only a legacy file
+        exists (e.g. ./cvshield_settings.json), it is imported.
+        """
+        for path in [self.path] + self.legacy_paths:
+            try:
+                settings = self._read(path)
+            except (OSError, ValueError):
+                continue
+            settings, changed = migrate(settings)
+            if changed or path != self.path:
+                try:
+                    self._write(settings)
+                except OSError:
+                    pass
+            else:
+                self._last_written = dict(settings)
+            return settings
+        return None
+
+    def save(self, settings, immediate=False):
+        """Queue ``settings`` for writing; saves within the window are merged."""
+        settings = dict(settings)
+        settings["schema_version"] = SCHEMA_VERSION
+        with self._lock:
+            if self._timer is None and settings == self._last_written:
+                return
+            self._pending = settings
+            if not immediate and self.coalesce_delay > 0:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.coalesce_delay, self._flush_in_background)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except OSError:
+            # Keep the settings queued; the next save or flush retries
+            pass
+
+    def flush(self):
+        """Write any pending settings now.
+
+        Only the snapshot is taken under the lock, so a save() from the Tk
+        thread never waits for a slow disk behind a background flush.
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                settings = self._pending
+                self._pending = None
+                if settings is None or settings == self._last_written:
+                    return
+                self._in_flight = settings
+            try:
+                atomic_write_json(self.path, settings)
+            except Exception:
+                with self._lock:
+                    self._in_flight = None
+                    # Keep it queued for the next attempt unless a newer save replaced it
+                    if self._pending is None:
+                        self._pending = settings
+                raise
+            with self._lock:
+                self._in_flight = None
+                self._last_written = dict(settings)
+                self.writes += 1
+
+    def read_if_changed(self):
+        """Return the file's settings if they differ from what was last loaded or saved.
+
+        Returns None for our own writes, for unchanged files and for files
+        that cannot be read or parsed (e.g. mid-way through a non-atomic write
+        by another tool); the current settings are kept in those cases.
+        """
+        try:
+            settings, _ = migrate(self._read(self.path))
+        except (OSError, ValueError, KeyError):
+            return None
+        with self._lock:
+            if settings in (self._last_written, self._pending, self._in_flight):
+                return None
+            self._last_written = dict(settings)
+        return settings
+
+    def _write(self, settings):
+        atomic_write_json(self.path, settings)
+        with self._lock:
+            self._last_written = dict(settings)
+            self.writes += 1
+
+
+# inotify(7) constants and the fixed part of each event record
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_EVENT = struct.Struct("iIII")
+
+
+def _inotify_watch(directory, mask):
+    """Return a non-blocking inotify fd watching ``directory``, or None."""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, os.fsencode(directory), mask) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class SettingsWatcher:
+    """Detect changes to the settings file made outside this process.
+
+    With inotify, ``fileno()`` becomes readable when the file's directory
+    changes and ``changed()`` tells whether the settings file was among the
+    changes. Without it, ``fileno()`` is None and the owner calls
+    ``changed()`` every ``interval`` seconds; the interval doubles, up to
+    ``max_interval``, each time nothing changed, and drops back to
+    ``min_interval`` after a change.
+    """
+
+    def __init__(self, path, min_interval=2.0, max_interval=60.0, use_inotify=True):
+        self.path = path
+        self.name = os.fsencode(os.path.basename(path))
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._fd = None
+        if use_inotify:
+            directory = os.path.dirname(path) or "."
+            os.makedirs(directory, exist_ok=True)
+            # The directory is watched because atomic saves replace the file's inode
+            self._fd = _inotify_watch(directory, _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE)
+        self._signature = self._stat()
+
+    def fileno(self):
+        return self._fd
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    def _drain_inotify(self):
+        touched = False
+        while True:
+            try:
+                data = os.read(self._fd, 4096)
+            except (BlockingIOError, OSError):
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _IN_EVENT.size <= len(data):
+                _, _, _, length = _IN_EVENT.unpack_from(data, offset)
+                start = offset + _IN_EVENT.size
+                if data[start:start + length].rstrip(b"\0") == self.name:
+                    touched = True
+                offset = start + length
+        return touched
+
+    def changed(self):
+        """Return True if the settings file changed since the last call."""
+        if self._fd is not None and not self._drain_inotify():
+            return False
+        signature = self._stat()
+        if signature == self._signature:
+            self.interval = min(self.max_interval, self.interval * 2)
+            return False
+        self._signature = signature
+        self.interval = self.min_interval
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
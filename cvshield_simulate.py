@@ -0,0 +1,343 @@
+"""Replay days of CVShield's break schedule in virtual time.
+
+``python CVShield.py simulate trace.jsonl`` runs the timer core (the same
+``BreakScheduler`` and ``IdleMonitor`` the app uses) on a virtual clock and
+prints the breaks it would have given. Nothing waits in real time and no
+window is opened, so a month replays in well under a second.
+
+The trace is JSON lines, one action each, in order of ``at`` (seconds, or
+"HH:MM" / "HH:MM:SS" from the start of the day)::
+
+    {"at": "09:00", "do": "start"}
+    {"at": "10:30", "do": "pause"}
+    {"at": "10:45", "do": "resume"}
+    {"at": "12:00", "do": "idle", "seconds": 2700}
+    {"at": "14:00", "do": "settings", "break_interval": 1800, "break_duration": 30}
+    {"at": "15:00", "do": "break_now"}
+    {"at": "17:30", "do": "stop"}
+
+``idle`` means no keyboard or mouse input for that many seconds; the usual
+idle-pause rules then apply. ``settings`` takes the same keys as the
+settings file (``break_interval``, ``break_duration``, ``idle_pause_seconds``,
+``schedules``, ``coalesce_seconds``) and applies them without restarting the
+cycle. With ``--days N`` the trace is replayed N times, a day apart.
+"""
+import argparse
+import collections
+import heapq
+import json
+import sys
+import time
+
+from cvshield_controller import TimerController, COMMANDS
+from cvshield_idle import IdleMonitor
+from cvshield_scheduler import BreakScheduler, schedule_from_config, WORKING, PAUSED, ON_BREAK, EVENT_STATE
+
+DAY = 86400
+ACTIONS = COMMANDS + ("idle", "settings")
+DEFAULT_SETTINGS = {"break_interval": 1200, "break_duration": 20, "idle_pause_seconds": 300,
+                    "schedules": [], "coalesce_seconds": 60}
+
+
+class VirtualClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class VirtualLoop:
+    """Stand-in for the Tk loop: ``after`` callbacks run in virtual time, instantly."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._queue = []
+        self._sequence = 0
+        self._cancelled = set()
+        self.callbacks_run = 0
+
+    def call_at(self, when, func, *args):
+        self._sequence += 1
+        heapq.heappush(self._queue, (when, self._sequence, func, args))
+        return self._sequence
+
+    def call_later(self, delay, func, *args):
+        return self.call_at(self.clock.now + delay, func, *args)
+
+    def cancel(self, handle):
+        if handle is not None:
+            self._cancelled.add(handle)
+
+    def run_until(self, end):
+        """Run every callback due up to ``end``, then leave the clock there."""
+        queue = self._queue
+        while queue and queue[0][0] <= end:
+            when, handle, func, args = heapq.heappop(queue)
+            if handle in self._cancelled:
+                self._cancelled.discard(handle)
+                continue
+            self.clock.now = max(self.clock.now, when)
+            self.callbacks_run += 1
+            func(*args)
+        self.clock.now = max(self.clock.now, end)
+
+
+class ScriptedActivity:
+    """Idle-time source for ``IdleMonitor`` that follows the trace's idle spans."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self._idle_since = None
+
+    def begin_idle(self):
+        self._idle_since = self.clock.now
+
+    def end_idle(self):
+        self._idle_since = None
+
+    def idle_seconds(self):
+        return 0.0 if self._idle_since is None else self.clock.now - self._idle_since
+
+
+def parse_time(value):
+    """Seconds from a number or an "HH:MM[:SS]" string."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    parts = [float(part) for part in str(value).split(":")]
+    if not 2 <= len(parts) <= 3:
+        raise ValueError("bad time %r" % value)
+    return parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) == 3 else 0)
+
+
+def load_trace(lines):
+    """Return [(at, action dict)] from JSON lines; raises ValueError on a bad line."""
+    actions = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            action = json.loads(line)
+            at = parse_time(action["at"])
+            if action["do"] not in ACTIONS:
+                raise ValueError("unknown action %r" % action["do"])
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError("line %d: %s" % (number, e))
+        actions.append((at, action))
+    actions.sort(key=lambda item: item[0])
+    return actions
+
+
+class Simulation:
+    """The app's timer logic, hosted on a ``VirtualLoop`` instead of Tk."""
+
+    def __init__(self, settings=None):
+        self.clock = VirtualClock()
+        self.loop = VirtualLoop(self.clock)
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.scheduler = BreakScheduler(clock=self.clock)
+        # Headless: wake only for deadlines, never for display changes
+        self.scheduler.granularity = 10 * 365 * DAY
+        self.scheduler.progress_resolution = 0
+        self.scheduler.subscribe(self._on_state)
+        # The app's own rules for commands and idle pauses
+        self.controller = TimerController(self.scheduler, self)
+        self.controller.subscribe(self._on_controller_event)
+        self.activity = ScriptedActivity(self.clock)
+        self.idle_monitor = IdleMonitor(self.activity, 300, on_idle=self.controller.user_idle,
+                                        on_active=self.controller.user_active, clock=self.clock)
+        self._tick = None
+        self.timeline = []
+        self.wakeups = 0
+        self.apply_settings(settings or {})
+
+    # -- the app's behaviour, minus the window --------------------------------
+
+    def apply_settings(self, changes):
+        """Same effect as a settings reload in the app: the cycle carries on."""
+        self.settings.update(changes)
+        self.scheduler.configure(self.settings["break_interval"], self.settings["break_duration"])
+        schedules = []
+        for config in self.settings["schedules"] or []:
+            # Like the app, an invalid schedule is reported and skipped
+            try:
+                schedules.append(schedule_from_config(config))
+            except ValueError as e:
+                print("cvshield: ignoring schedule %r: %s" % (config, e), file=sys.stderr)
+        self.scheduler.set_schedules(schedules, coalesce_window=self.settings["coalesce_seconds"])
+        self.idle_monitor.threshold = self.settings["idle_pause_seconds"]
+        self._schedule_tick()
+
+    def _schedule_tick(self):
+        self.loop.cancel(self._tick)
+        self._tick = None
+        delay = self.scheduler.next_wakeup()
+        if delay is not None:
+            self._tick = self.loop.call_later(delay, self._track_time)
+
+    def _track_time(self):
+        self._tick = None
+        self.wakeups += 1
+        self.scheduler.poll()
+        self._schedule_tick()
+
+    def _on_state(self, scheduler, event):
+        if event != EVENT_STATE:
+            return
+        now = self.clock.now
+        if scheduler.state == ON_BREAK:
+            schedule = scheduler.current_schedule
+            late = now - scheduler.break_due if scheduler.break_due is not None else 0.0
+            self._record("break", length=scheduler.break_length, late=round(late, 3),
+                         schedule=schedule.name if schedule else None)
+        elif scheduler.previous_state == ON_BREAK:
+            self._record("break_end" if scheduler.state == WORKING else "break_skipped",
+                         length=round(scheduler.previous_state_duration, 3))
+
+    def _on_controller_event(self, controller, action, details):
+        if action == "pause":
+            if details["source"] == "idle":
+                self._record("idle_pause", idle=round(details["idle_seconds"], 3))
+            else:
+                self._record("pause")
+        elif action == "idle_break":
+            self._record("idle_break", away=round(details["away_seconds"], 3))
+        elif action == "resume":
+            away = details.get("away_seconds")
+            self._record("resume", away=round(away, 3) if away is not None else None)
+
+    # -- the host side of TimerController -----------------------------------
+
+    def start_timer(self):
+        self.scheduler.start()
+        self._record("start")
+        self._schedule_tick()
+
+    def stop_timer(self):
+        self.scheduler.stop()
+        self.controller.idle_paused = False
+        self._record("stop")
+        self._schedule_tick()
+
+    def timer_changed(self):
+        self._schedule_tick()
+
+    def _record(self, kind, **details):
+        self.timeline.append(dict(details, at=self.clock.now, event=kind))
+
+    # -- trace actions ------------------------------------------------------
+
+    def act(self, action):
+        kind = action["do"]
+        if kind in COMMANDS:
+            self.controller.run_command(kind)
+        elif kind == "idle":
+            self._idle(float(action["seconds"]))
+        elif kind == "settings":
+            self.apply_settings({key: value for key, value in action.items() if key in DEFAULT_SETTINGS})
+        self._schedule_tick()
+
+    def _idle(self, seconds):
+        # The monitor is polled exactly when its answer can change, instead of every second
+        self.activity.begin_idle()
+        start = self.clock.now
+        threshold = self.idle_monitor.threshold
+        if 0 < threshold < seconds:
+            self.loop.call_at(start + threshold, self._poll_idle, start + seconds)
+        self.loop.call_at(start + seconds, self.activity.end_idle)
+        self.loop.call_at(start + seconds, self.idle_monitor.poll)
+
+    def _poll_idle(self, until):
+        delay = self.idle_monitor.poll()
+        # Declined (during a break): ask again as the app would, while still away
+        if not self.idle_monitor.is_idle and self.clock.now + delay < until:
+            self.loop.call_later(delay, self._poll_idle, until)
+
+    def run(self, actions, days=1):
+        """Replay ``actions`` (from ``load_trace``) once per day for ``days`` days."""
+        for day in range(days):
+            for at, action in actions:
+                self.loop.run_until(day * DAY + at)
+                self.act(action)
+        self.loop.run_until(days * DAY)
+        if self.scheduler.state == PAUSED and self.controller.idle_paused:
+            # An idle span still open at the end of the run
+            self.idle_monitor.poll()
+        return self.timeline
+
+
+def summarize(timeline, days, wakeups):
+    """Return aggregate figures for a simulated timeline."""
+    counts = collections.Counter(entry["event"] for entry in timeline)
+    breaks = [entry for entry in timeline if entry["event"] == "break"]
+    by_schedule = collections.Counter(entry.get("schedule") or "default" for entry in breaks)
+    break_time = sum(entry["length"] for entry in timeline if entry["event"] in ("break_end", "break_skipped"))
+    gaps = [later["at"] - earlier["at"] for earlier, later in zip(breaks, breaks[1:])
+            if later["at"] - earlier["at"] < DAY / 2]
+    return {
+        "days": days,
+        "breaks": len(breaks),
+        "breaks_per_day": round(len(breaks) / days, 2) if days else 0,
+        "breaks_by_schedule": dict(by_schedule),
+        "idle_breaks": counts["idle_break"],
+        "pauses": counts["pause"],
+        "idle_pauses": counts["idle_pause"],
+        "break_minutes": round(break_time / 60, 1),
+        "mean_minutes_between_breaks": round(sum(gaps) / len(gaps) / 60, 1) if gaps else None,
+        "wakeups": wakeups,
+    }
+
+
+def format_at(seconds):
+    day, rest = divmod(int(seconds), DAY)
+    return "day %d %02d:%02d:%02d" % (day + 1, rest // 3600, rest % 3600 // 60, rest % 60)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="CVShield simulate", description=__doc__.splitlines()[0])
+    parser.add_argument("trace", help="JSON-lines activity trace ('-' for stdin)")
+    parser.add_argument("--days", type=int, default=1, help="replay the trace this many days in a row")
+    parser.add_argument("--settings", help="settings file to start from (default: 20 min / 20 s)")
+    parser.add_argument("--json", action="store_true", help="print the timeline and stats as JSON")
+    parser.add_argument("--quiet", action="store_true", help="print only the stats")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.trace == "-":
+            actions = load_trace(sys.stdin)
+        else:
+            with open(args.trace, "r") as fh:
+                actions = load_trace(fh)
+        settings = {}
+        if args.settings:
+            with open(args.settings, "r") as fh:
+                settings = {key: value for key, value in json.load(fh).items() if key in DEFAULT_SETTINGS}
+    except (OSError, ValueError) as e:
+        print("cvshield: %s" % e, file=sys.stderr)
+        return 2
+
+    started = time.perf_counter()
+    simulation = Simulation(settings)
+    timeline = simulation.run(actions, args.days)
+    stats = summarize(timeline, args.days, simulation.wakeups)
+    stats["wall_seconds"] = round(time.perf_counter() - started, 4)
+
+    if args.json:
+        print(json.dumps({"timeline": [] if args.quiet else timeline, "stats": stats}, indent=2))
+        return 0
+    if not args.quiet:
+        for entry in timeline:
+            details = " ".join("%s=%s" % (key, value) for key, value in sorted(entry.items())
+                               if key not in ("at", "event") and value is not None)
+            print("%s  %-13s %s" % (format_at(entry["at"]), entry["event"], details))
+        print()
+    for key, value in stats.items():
+        print("%-28s %s" % (key, value))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Opt-in event tracing for CVShield, exported as Chrome trace JSON.
+
+When enabled (``python CVShield.py --trace``), every ``root.after`` /
+``after_idle`` callback, every nested ``wait_variable`` loop, the break and
+preferences entry points and every scheduler state transition are recorded
+into a fixed-size ring buffer. ``dump`` writes the buffer in the Trace Event
+format that chrome://tracing and https://ui.perfetto.dev load directly.
+
+Nothing is patched unless a tracer is installed, so a normal run pays
+nothing for this module; it is not even imported.
+"""
+import collections
+import datetime
+import functools
+import os
+import threading
+import time
+
+from cvshield_settings import atomic_write_json
+
+DEFAULT_CAPACITY = 100000
+
+# App methods worth a span of their own, beyond the Tk callbacks around them
+TRACED_METHODS = (
+    "start_break",
+    "block_screen_for_break",
+    "_finish_break_screen",
+    "_prefetch_break",
+    "edit_preferences",
+    "set_initial_break_settings",
+    "save_settings",
+    "load_settings",
+    "setup_system_tray",
+    "_ensure_break_frame",
+    "_ensure_preferences_frame",
+)
+
+
+def default_trace_path():
+    """Return a fresh trace file path in the per-user cache directory."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(base, "cvshield", "traces", "trace-%s-%d.json" % (stamp, os.getpid()))
+
+
+def _now_us():
+    return time.perf_counter_ns() // 1000
+
+
+class Tracer:
+    """Ring buffer of trace events; the oldest are dropped once full."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        # deque.append is atomic, so worker threads can record without a lock
+        self.events = collections.deque(maxlen=capacity)
+        self.pid = os.getpid()
+
+    def complete(self, name, category, start, end, args=None):
+        self.events.append(("X", name, category, start, end - start, threading.get_ident(), args))
+
+    def instant(self, name, category, args=None):
+        self.events.append(("i", name, category, _now_us(), 0, threading.get_ident(), args))
+
+    def wrap(self, func, name=None, category="call"):
+        """Return ``func`` wrapped to record a span around every call."""
+        name = name or getattr(func, "__qualname__", None) or repr(func)
+
+        @functools.wraps(func)
+        def traced(*args, **kwargs):
+            start = _now_us()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.complete(name, category, start, _now_us())
+        return traced
+
+    def wrap_methods(self, obj, names):
+        """Shadow each bound method in ``names`` with a traced one."""
+        for name in names:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(obj, name, self.wrap(method, "%s.%s" % (type(obj).__name__, name)))
+
+    def install_tk(self, root):
+        """Trace callbacks scheduled through ``root`` and its modal waits."""
+        after, after_idle = root.after, root.after_idle
+
+        def traced_after(ms, func=None, *args):
+            if func is None:
+                return after(ms)
+            return after(ms, self.wrap(func, category="tk.after"), *args)
+
+        def traced_after_idle(func, *args):
+            return after_idle(self.wrap(func, category="tk.after_idle"), *args)
+
+        root.after = traced_after
+        root.after_idle = traced_after_idle
+        root.wait_variable = self.wrap(root.wait_variable, "wait_variable", "tk.wait")
+
+    def install(self, app):
+        """Trace ``app``'s Tk callbacks, entry points and scheduler transitions."""
+        self.install_tk(app.root)
+        self.wrap_methods(app, TRACED_METHODS)
+        app.scheduler.subscribe(self._on_scheduler_event)
+
+    def _on_scheduler_event(self, scheduler, event):
+        if event == "tick":
+            # Ticks already show up as the after() callbacks that drive them
+            return
+        self.instant("scheduler.%s" % event, "scheduler", {
+            "from": scheduler.previous_state,
+            "to": scheduler.state,
+            "previous_duration_s": round(scheduler.previous_state_duration, 3),
+        })
+
+    def to_chrome(self):
+        """Return the buffered events as a Trace Event format dict."""
+        events = []
+        for phase, name, category, ts, dur, tid, args in list(self.events):
+            event = {"name": name, "cat": category, "ph": phase, "ts": ts, "pid": self.pid, "tid": tid}
+            if phase == "X":
+                event["dur"] = dur
+            else:
+                event["s"] = "p"
+            if args:
+                event["args"] = args
+            events.append(event)
+        for thread in threading.enumerate():
+            events.append({"name": "thread_name", "ph": "M", "pid": self.pid, "tid": thread.ident,
+                           "args": {"name": thread.name}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def dump(self, path=None):
+        """Write the buffer as Chrome trace JSON; returns the path written."""
+        path = path or default_trace_path()
+        atomic_write_json(path, self.to_chrome())
+        return path
@@ -0,0 +1,60 @@
+"""System tray helpers for CVShield.
+
+The tray icon shows a progress ring counting down to the next break. Rather
+than drawing a new image on every tick, a fixed set of frames is rendered
+once per session and the icon is only swapped when the visible frame changes.
+"""
+from PIL import Image, ImageDraw
+
+RING_COLOR = (66, 153, 225, 255)
+TRACK_COLOR = (226, 232, 240, 160)
+BREAK_COLOR = (72, 187, 120, 255)
+
+
+class TrayProgressFrames:
+    """Pre-rendered tray icons showing 0..steps progress ring segments."""
+
+    def __init__(self, base_icon, steps=24, size=64, supersample=4):
+        self.base_icon = base_icon
+        self.steps = steps
+        self.size = size
+        self.supersample = supersample
+        self._frames = None
+        self._break_frame = None
+
+    def _render(self, fraction, color):
+        scale = self.supersample
+        big = self.size * scale
+        canvas = Image.new("RGBA", (big, big), (0, 0, 0, 0))
+        # Logo in the middle, ring around it
+        inner = int(big * 0.62)
+        logo = self.base_icon.convert("RGBA").resize((inner, inner), Image.LANCZOS)
+        offset = (big - inner) // 2
+        canvas.alpha_composite(logo, (offset, offset))
+        draw = ImageDraw.Draw(canvas)
+        width = max(1, int(big * 0.1))
+        box = [width // 2, width // 2, big - width // 2 - 1, big - width // 2 - 1]
+        draw.ellipse(box, outline=TRACK_COLOR, width=width)
+        if fraction >= 1:
+            draw.ellipse(box, outline=color, width=width)
+        elif fraction > 0:
+            draw.arc(box, -90, -90 + 360 * fraction, fill=color, width=width)
+        return canvas.resize((self.size, self.size), Image.LANCZOS)
+
+    def _ensure_rendered(self):
+        if self._frames is None:
+            self._frames = [self._render(i / self.steps, RING_COLOR) for i in range(self.steps + 1)]
+            self._break_frame = self._render(1.0, BREAK_COLOR)
+
+    def index_for(self, fraction):
+        """Return the frame index for an elapsed fraction of the work period."""
+        fraction = min(1.0, max(0.0, fraction))
+        return int(fraction * self.steps)
+
+    def frame(self, index):
+        self._ensure_rendered()
+        return self._frames[index]
+
+    def break_frame(self):
+        self._ensure_rendered()
+        return self._break_frame